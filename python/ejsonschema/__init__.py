@@ -1,4 +1,20 @@
-from .validate import ExtValidator, SchemaValidator
-from .schemaloader import SchemaLoader
-from jsonschema.exceptions import (ValidationError, SchemaError, 
-                                   RefResolutionError)
+import importlib
+
+# the public names re-exported from submodules.  These are imported on first 
+# access so that light-weight uses of the package (e.g. "validate -h") do not
+# pay for importing jsonschema.
+_exports = {
+    "ExtValidator":       "validate",
+    "SchemaValidator":    "validate",
+    "SchemaLoader":       "schemaloader",
+    "clear_schema_pool":  "schemaloader",
+    "ValidationError":    "validate",
+    "SchemaError":        "validate",
+    "RefResolutionError": "validate"
+}
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module("."+_exports[name], __name__), name)
@@ -0,0 +1,56 @@
+"""
+internal helpers, shared by the package's modules, for parsing and 
+serializing JSON and for retrieving it from remote servers
+"""
+import json, re
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson, if available, parses (and serializes) much faster than the json 
+# module.  It does not parse all JSON the same way, though:  it rejects 
+# NaN and Infinity (and numbers too large for a double), and it reads 
+# integers outside of the range of 64-bit integers (-2**63 to 2**64-1) as 
+# floats.  Input that may contain such integers (a run of 19 or more 
+# digits) or that orjson rejects is parsed with the json module instead, 
+# so that the results do not depend on whether orjson is installed.
+_long_digits = re.compile(br'\d{19}')
+
+def _loads(data):
+    # parse JSON from bytes (or a bytes-like object such as a memoryview)
+    if orjson:
+        if not _long_digits.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        if not isinstance(data, bytes):
+            data = bytes(data)
+    return json.loads(data)
+
+if orjson:
+    _dumps = orjson.dumps
+else:
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+_session = None
+def _http_session():
+    # return a requests Session shared by all loaders, so that connections
+    # to a server are reused across remote requests
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, 
+                                                pool_maxsize=64)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
@@ -1,13 +1,9 @@
 # import pytest
-import json, os, sys, pytest, shutil, argparse
-try:
-    # python 2
-    from cStringIO import StringIO
-except ImportError:
-    # python 3
-    from io import StringIO
+import os, sys, json, pytest, argparse
+from io import StringIO
 
 import ejsonschema.cli.validate as cli
+from ejsonschema.schemaloader import schemaLoader_for_schemas
 
 from ...tests.config import schema_dir as schemadir, data_dir as datadir, \
                             examples_dir as exdir
@@ -28,11 +24,10 @@ class TstSys(object):
 @pytest.fixture
 def tstsys():
     out = TstSys()
+    old = argparse._sys
     argparse._sys = out
-    def finalize():
-        argparse._sys = sys
-
-    return out
+    yield out
+    argparse._sys = old
 
 def test_opts(tstsys):
     parser = cli.define_opts("goob")
@@ -60,7 +55,7 @@ def test_opts(tstsys):
 def test_simple_valid(tstsys):
 
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} {1}".format(schemadir, enh_json_schema).split()
+    tstsys.argv[1:] = f"-L {schemadir} {enh_json_schema}".split()
     exit = app.execute()
 
     assert ": valid!" in tstsys.stdout.getvalue()
@@ -70,7 +65,90 @@ def test_simple_valid(tstsys):
 def test_load_ejs(tstsys):
 
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-e {0}".format(enh_json_schema).split()
+    tstsys.argv[1:] = f"-e {enh_json_schema}".split()
+    exit = app.execute()
+
+    assert ": valid!" in tstsys.stdout.getvalue()
+    assert not tstsys.stderr.getvalue()
+    assert exit == 0
+
+def test_loader_cache(tstsys):
+
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = f"-e -L {exdir} {ipr_ex}".split()
+    assert app.execute() == 0
+    hits = cli._loader_for.cache_info().hits
+
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    assert app.execute() == 0
+    assert cli._loader_for.cache_info().hits == hits + 1
+
+    # merging with the EJS schemas must not alter the shared EJS loader
+    ejsldr = schemaLoader_for_schemas()
+    with pytest.raises(KeyError):
+        ejsldr.locate("http://mgi.nist.gov/json/registry-resource/v0.1")
+
+def _loc(path):
+    st = os.stat(path)
+    return (path, (st.st_mtime_ns, st.st_size), True)
+
+def test_loader_cache_refresh(tstsys, tmp_path):
+    schema = { "$schema": "http://json-schema.org/draft-04/schema#",
+               "id": "urn:goob", "type": "object" }
+    sfile = tmp_path / "goob.json"
+    sfile.write_text(json.dumps(schema))
+
+    loc = str(tmp_path)
+    ldr = cli._loader_for(_loc(loc), False)
+    assert "urn:goob" in ldr
+
+    # a file edited in place is only noticed after clearing the cache
+    schema["id"] = "urn:gurn"
+    sfile.write_text(json.dumps(schema))
+    assert cli._loader_for(_loc(loc), False) is ldr
+    cli.clear_loader_cache()
+    ldr = cli._loader_for(_loc(loc), False)
+    assert "urn:gurn" in ldr
+    assert "urn:goob" not in ldr
+
+    # an added file changes the directory
+    st = os.stat(loc)
+    schema["id"] = "urn:goob"
+    (tmp_path / "goob2.json").write_text(json.dumps(schema))
+    os.utime(loc, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    ldr = cli._loader_for(_loc(loc), False)
+    assert "urn:goob" in ldr
+    assert "urn:gurn" in ldr
+
+def test_run_no_fingerprint(tstsys, monkeypatch):
+    # a single run has no use for fingerprinting the schema directory
+    from ejsonschema.schemaloader import DirectorySchemaCache
+    def nofingerprint(self, *args):
+        raise AssertionError("directory needlessly fingerprinted")
+    monkeypatch.setattr(DirectorySchemaCache, "_fingerprint", nofingerprint)
+    cli.clear_loader_cache()
+
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = f"-L {schemadir} {enh_json_schema}".split()
+    assert app.execute() == 0
+    assert ": valid!" in tstsys.stdout.getvalue()
+
+def test_numbers(tstsys, tmp_path):
+    # big integers and NaN parse as the json module would parse them
+    sdir = tmp_path / "schemas"
+    sdir.mkdir()
+    (sdir / "numbers.json").write_text(json.dumps({
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "id": "urn:numbers", "type": "object",
+        "properties": { "n": { "type": "integer" },
+                        "x": { "type": "number" } }
+    }))
+    doc = tmp_path / "doc.json"
+    doc.write_text('{ "$schema": "urn:numbers", '
+                   '"n": 18446744073709551616, "x": NaN }')
+
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = f"-L {sdir} {doc}".split()
     exit = app.execute()
 
     assert ": valid!" in tstsys.stdout.getvalue()
@@ -81,18 +159,29 @@ def test_simple_invalid(tstsys):
 
     baddoc = os.path.join(datadir, "invalidextension.json")
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} {1}".format(schemadir, baddoc).split()
+    tstsys.argv[1:] = f"-L {schemadir} {baddoc}".split()
     exit = app.execute()
 
     assert "3 is not of type" in tstsys.stderr.getvalue()
     assert ": not valid" in tstsys.stdout.getvalue()
     assert exit == 1
 
+def test_silent(tstsys):
+
+    baddoc = os.path.join(datadir, "invalidextension.json")
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = f"-L {schemadir} -s {baddoc} goober.json".split()
+    exit = app.execute()
+
+    assert not tstsys.stdout.getvalue()
+    assert not tstsys.stderr.getvalue()
+    assert exit == 1
+
 def test_cant_resolve(tstsys):
 
     #pytest.set_trace()
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "{0}".format(enh_json_schema).split()
+    tstsys.argv[1:] = f"{enh_json_schema}".split()
     exit = app.execute()
 
     assert "Unable to find schema document" in tstsys.stderr.getvalue()
@@ -103,7 +192,7 @@ def test_ignore_ext(tstsys):
 
     baddoc = os.path.join(datadir, "invalidextension.json")
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} -g {1}".format(schemadir, baddoc).split()
+    tstsys.argv[1:] = f"-L {schemadir} -g {baddoc}".split()
     exit = app.execute()
 
     assert ": valid!" in tstsys.stdout.getvalue()
@@ -113,7 +202,7 @@ def test_ignore_ext(tstsys):
 def test_strict(tstsys):
 
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} {1}".format(exdir, ipr_ex).split()
+    tstsys.argv[1:] = f"-L {exdir} {ipr_ex}".split()
     exit = app.execute()
 
     assert ": valid!" in tstsys.stdout.getvalue()
@@ -124,7 +213,7 @@ def test_strict(tstsys):
     tstsys.stderr = StringIO()
 
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} -C {1}".format(exdir, ipr_ex).split()
+    tstsys.argv[1:] = f"-L {exdir} -C {ipr_ex}".split()
     exit = app.execute()
 
     assert "Unable to find schema document" in tstsys.stderr.getvalue()
@@ -134,10 +223,32 @@ def test_strict(tstsys):
 def test_schema_override(tstsys):
 
     app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
-    tstsys.argv[1:] = "-L {0} -S urn:gurn {1}".format(exdir, ipr_ex).split()
+    tstsys.argv[1:] = f"-L {exdir} -S urn:gurn {ipr_ex}".split()
     exit = app.execute()
 
     assert "Unable to find schema document" in tstsys.stderr.getvalue()
     assert ": not valid" in tstsys.stdout.getvalue()
     assert exit == 2
-    
+
+    tstsys.stderr = StringIO()
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = f"-L {exdir} -v -S urn:gurn {ipr_ex}".split()
+    exit = app.execute()
+
+    assert "Cached schemas available:\n   http://mgi.nist.gov/json/" \
+        in tstsys.stderr.getvalue()
+    assert exit == 2
+
+def test_jobs(tstsys):
+
+    baddoc = os.path.join(datadir, "invalidextension.json")
+    app = cli.Validate("goob", tstsys.stdout, tstsys.stderr)
+    tstsys.argv[1:] = \
+        f"-L {schemadir} -j 2 {enh_json_schema} {baddoc} goober.json".split()
+    exit = app.execute()
+
+    assert tstsys.stdout.getvalue().splitlines() == \
+        [ "enhanced-json-schema.json: valid!",
+          "invalidextension.json: not valid." ]
+    assert "goober.json: file not found" in tstsys.stderr.getvalue()
+    assert exit == 1
@@ -1,13 +1,10 @@
 """
 The implementation for the script that provides the command-line interface (CLI)
 """
-import os, sys, errno, json
-from io import StringIO
+import os, sys, stat, errno, threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from argparse import ArgumentParser
-from ..validate import ExtValidator
-from ..validate import ValidationError, SchemaError, RefResolutionError
-from ..validate import MissingSchemaDocument
-from ..schemaloader import SchemaLoader, schemaLoader_for_schemas 
 
 description = \
 """validate one or more JSON documents against their schemas"""
@@ -35,6 +32,9 @@ def define_opts(progname=None):
                         dest='strict', 
                         help="Fail if an extensions schema cannot be loaded "
                             +"(otherwise, ignore unresolvable extensions)")
+    parser.add_argument('-j', '--jobs', type=int, dest='jobs', metavar='N',
+                        default=1,
+                        help="validate up to N files concurrently (default: 1)")
     parser.add_argument('-q', '--quiet', action='store_true', 
                         help="suppress messages explaining why documents are "
                             +"invalid; only short success/failure message for "
@@ -62,6 +62,45 @@ def define_opts(progname=None):
 
     return parser
 
+@lru_cache(maxsize=4)
+def _loader_for(loc, loadejs):
+    """
+    return a SchemaLoader for the schemas in a given directory or listed in a
+    given location file, optionally merged with the schemas needed to validate
+    EJS schema documents.  Loaders are cached for reuse by later runs in the 
+    same process (see clear_loader_cache()).
+
+    :argument tuple loc:  the real path to the directory or location file,
+                          its modification time and size (so that a 
+                          location file that has changed, or a directory 
+                          with files added or removed, gets reloaded), and 
+                          whether it is a directory; or None if no location 
+                          was given
+    :argument bool loadejs:  if True, include the EJS schemas
+    """
+    from ..schemaloader import SchemaLoader, schemaLoader_for_schemas
+
+    loader = SchemaLoader()
+    if loadejs:
+        loader.copy_locations_from(schemaLoader_for_schemas())
+    if loc:
+        if loc[2]:
+            ldr = SchemaLoader.from_directory(loc[0])
+        else:
+            ldr = SchemaLoader.from_location_file(loc[0])
+        if not loadejs:
+            return ldr
+        loader.copy_locations_from(ldr)
+    return loader
+
+def clear_loader_cache():
+    """
+    forget the schema loaders cached by earlier runs, so that the next run 
+    reloads its schemas.  Without this, a later run in the same process 
+    does not notice schema files in a directory that were edited in place.
+    """
+    _loader_for.cache_clear()
+
 # Exit codes
 INVALID   = 1    # one or more input files are invalid
 BADSCHEMA = 2    # problem found with one or more schemas (including missing)
@@ -95,7 +134,7 @@ class Runner(object):
         try:
             return self.run()
         except Exception as ex:
-            return self.fail(UNEXPECTED, "Unexpected exception: " + str(ex))
+            return self.fail(UNEXPECTED, f"Unexpected exception: {ex}")
 
     def run(self):
         return 0
@@ -108,31 +147,28 @@ class Runner(object):
         return exitcode
 
     def complain(self, message):
-        if (hasattr(self.opts, self._q) and getattr(self.opts, self._q)) or \
-           (hasattr(self.opts, self._q) and getattr(self.opts, self._q)):
+        if getattr(self.opts, self._q, False) or \
+           getattr(self.opts, self._s, False):
             return
 
         if self.prog:
-            self.err.write(self.prog)
-            self.err.write(": ")
-        self.err.write(message)
-        self.err.write('\n')
+            message = f"{self.prog}: {message}"
+        self.err.write(message + '\n')
         self.err.flush()
 
     def advise(self, message):
-        if hasattr(self.opts, self._q) and getattr(self.opts, self._q):
+        if getattr(self.opts, self._q, False) or \
+           getattr(self.opts, self._s, False):
             return
 
-        self.err.write(message)
-        self.err.write('\n')
+        self.err.write(message + '\n')
         self.err.flush()
 
     def tell(self, message):
-        if hasattr(self.opts, self._s) and getattr(self.opts, self._s):
+        if getattr(self.opts, self._s, False):
             return
 
-        self.out.write(message)
-        self.out.write('\n')
+        self.out.write(message + '\n')
         self.out.flush()
 
     
@@ -147,68 +183,106 @@ class Validate(Runner):
 
         Command line arguments are parsed from sys.argv.  
         """
+        # these are imported here to keep start-up fast for simple 
+        # invocations (like -h)
+        from ..validate import (ExtValidator, MissingSchemaDocument,
+                                SchemaError, RefResolutionError)
+
         if self.opts.silent:
             self.opts.quiet = False
         if self.opts.quiet:
             self.opts.verbose = False
 
-        loader = (self.opts.loadejs and schemaLoader_for_schemas()) or None
-
+        loc = None
         if self.opts.loc:
-            if not os.path.exists(self.opts.loc):
+            locpath = os.path.realpath(self.opts.loc)
+            try:
+                st = os.stat(locpath)
+            except OSError:
                 return self.fail(BADINPUTS, 
-                                 self.opts.loc + ": schema file/dir not found")
-
-            if os.path.isdir(self.opts.loc):
-                ldr = SchemaLoader.from_directory(self.opts.loc)
-            else:
-                ldr = SchemaLoader.from_location_file(self.opts.loc)
-
-            if loader:
-                loader.copy_locations_from(ldr)
-            else:
-                loader = ldr
-            
-        val = ExtValidator(loader, ejsprefix=self.opts.epfx)
+                                 f"{self.opts.loc}: schema file/dir not found")
+
+            loc = (locpath, (st.st_mtime_ns, st.st_size), 
+                   stat.S_ISDIR(st.st_mode))
+
+        # validators (and the schemas compiled in them) are only used for 
+        # this run, so schemas changed since earlier runs are picked up
+        loader = _loader_for(loc, self.opts.loadejs)
+
+        pool = None
+        if self.opts.jobs > 1 and len(self.opts.files) > 1:
+            # a validator's resolver is not safe to share across threads, so
+            # each worker gets its own (all sharing the same schema loader)
+            local = threading.local()
+            def check(filename):
+                if not hasattr(local, 'val'):
+                    local.val = ExtValidator(loader, ejsprefix=self.opts.epfx)
+                return self._check_file(local.val, filename)
+
+            pool = ThreadPoolExecutor(min(self.opts.jobs, len(self.opts.files)))
+            results = pool.map(check, self.opts.files)
+        else:
+            val = ExtValidator(loader, ejsprefix=self.opts.epfx)
+            results = (self._check_file(val, f) for f in self.opts.files)
 
-        doc = None
         anyinvalid = False
         badschema = False
-        for filename in self.opts.files:
-            try:
-                if not os.path.exists(filename):
-                    self.complain(filename + ": file not found.")
+        try:
+            # results are reported in the order the files were given
+            for filename, ex in zip(self.opts.files, results):
+                f = os.path.basename(filename)
+                if ex is None:
+                    if not self.opts.silent:
+                        self.tell(f"{f}: valid!")
+                    continue
+                if isinstance(ex, IOError):
+                    self.complain(f"{filename}: file not found.")
                     continue
-                with open(filename) as fd:
-                    doc = json.load(fd)
-
-                val.validate(doc, self.opts.minimal, self.opts.strict, 
-                             self.opts.docschema)
 
-                if not self.opts.silent:
-                    self.tell("{0}: valid!".format(os.path.basename(filename)))
-            except (ValidationError, SchemaError, RefResolutionError) as ex:
-                f = os.path.basename(filename)
-                self.advise("{0}:".format(f))
+                self.advise(f"{f}:")
                 if isinstance(ex, MissingSchemaDocument):
-                    self.advise("Warning: "+str(ex))
+                    self.advise(f"Warning: {ex}")
                     if self.opts.verbose:
-                        mfd = StringIO()
-                        mfd.write("Cached schemas available:")
-                        for sid in loader.iterURIs():
-                            mfd.write("\n   ")
-                            mfd.write(sid)
-                        self.advise(mfd.getvalue())
+                        self.advise("\n   ".join(
+                            ["Cached schemas available:"] + 
+                            list(loader.iterURIs())))
                         
                 elif isinstance(ex, RefResolutionError):
-                    self.advise("Unable to resolve reference in schema: "+
-                                str(ex))
+                    self.advise(f"Unable to resolve reference in schema: {ex}")
                 else:
                     self.advise(str(ex))
-                self.tell("{0}: not valid.".format(f))
+                self.tell(f"{f}: not valid.")
                 anyinvalid = True
                 if isinstance(ex, (SchemaError, RefResolutionError)):
                     badschema = True
-
+        finally:
+            if pool:
+                pool.shutdown()
 
         return (badschema and BADSCHEMA) or (anyinvalid and INVALID) or 0
+
+    def _check_file(self, val, filename):
+        """
+        validate the JSON document in the given file with the given validator.
+
+        :return Exception:  the validation error raised for the document, an 
+                            IOError if the file does not exist, or None if 
+                            the document is valid.
+        """
+        from ..validate import ValidationError, SchemaError, RefResolutionError
+        from ..schemaloader import _parse_file
+
+        try:
+            # parse it as ExtValidator.validate_file() would
+            doc = _parse_file(filename)
+        except IOError as ex:
+            if ex.errno == errno.ENOENT:
+                return ex
+            raise
+
+        try:
+            val.validate(doc, self.opts.minimal, self.opts.strict, 
+                         self.opts.docschema)
+        except (ValidationError, SchemaError, RefResolutionError) as ex:
+            return ex
+        return None
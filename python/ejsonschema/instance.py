@@ -12,6 +12,8 @@ except ImportError:
     from urlparse import urlparse
     from urllib2 import urlopen
 
+from ._support import requests, _loads, _http_session
+
 EXTSCHEMAS = "extensionSchemas"
 DEF_EXTSCHEMAS = "$"+EXTSCHEMAS
 
@@ -73,22 +75,17 @@ class Instance(object):
         # (v2.5.1)
         if not url.scheme:
             # it's a file
-            with open(loc) as fd:
-                data = json.load(fd)
-        elif (
-            scheme in [u"http", u"https"] and
-            requests and
-            getattr(requests.Response, "json", None) is not None
-        ):
-            # Requests has support for detecting the correct encoding of
-            # json over http
-            if callable(requests.Response.json):
-                data = requests.get(loc).json()
-            else:
-                data = requests.get(loc).json
+            with open(loc, 'rb') as fd:
+                data = _loads(fd.read())
+        elif url.scheme in (u"http", u"https") and requests:
+            # use the session shared with the schema loaders so that 
+            # connections to the server get reused; parse the raw body 
+            # ourselves rather than via Response.json()
+            data = _loads(_http_session().get(loc).content)
         else: 
-            # Otherwise, pass off to urllib and assume utf-8
-            data = json.loads(urlopen(uri).read().decode("utf-8"))
+            # Otherwise, pass off to urllib; the parser detects the
+            # encoding of the raw bytes itself
+            data = _loads(urlopen(loc).read())
 
         return Instance(data, loc, extschemastag=extschemastag)
 
@@ -148,18 +145,26 @@ class Instance(object):
                                         "/".join([path,str(i)]))
 
     def _find_obj_by_prop(self, name, data, out, path=""):
-        if isinstance(data, dict):
-            if name in data:
-                out.append( (path or "/", data) )
-
-            for prop in data:
-                self._find_obj_by_prop(name, data[prop], out, 
-                                       "/".join([path,prop]))
-
-        if isinstance(data, list):
-            for i in range(len(data)):
-                self._find_obj_by_prop(name, data[i], out, 
-                                       "/".join([path,str(i)]))
+        # walk the tree with an explicit stack rather than by recursion; 
+        # children are pushed in reverse so that matches come out in 
+        # document order.  Only containers are pushed.
+        stack = [ (path, data) ]
+        while stack:
+            (path, data) = stack.pop()
+            if isinstance(data, dict):
+                if name in data:
+                    out.append( (path or "/", data) )
+                children = [ ("/".join((path,prop)), val)
+                             for prop, val in data.items()
+                             if isinstance(val, (dict, list)) ]
+            elif isinstance(data, list):
+                children = [ ("/".join((path,str(i))), val)
+                             for i, val in enumerate(data)
+                             if isinstance(val, (dict, list)) ]
+            else:
+                continue
+            children.reverse()
+            stack.extend(children)
 
     def find_obj_by_prop(self, name):
         """
@@ -4,13 +4,27 @@ This includes the ability to make use of copies of the schema documents on
 local disk.
 """
 from __future__ import with_statement
-import sys, os, json
+import sys, os, io, json
 try:
-    from urllib.parse import urlparse
+    from urllib.parse import urlsplit
 except ImportError:
-    from urlparse import urlparse
+    from urlparse import urlsplit
 
-def parse_mappings_asjson(fd):
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# location files larger than this are parsed incrementally (when ijson is
+# available)
+STREAM_PARSE_THRESHOLD = 1 << 20
+
+def parse_mappings_asjson(fd, transform=None):
     """
     read the locations contained in the given file stream.  The format
     should be a JSON object whose keys are the URIs and their values the 
@@ -18,15 +32,42 @@ def parse_mappings_asjson(fd):
 
     :argument file fd:  the file stream object containing the data in 
                         JSON format
+    :argument func transform:  if provided, a function that will be called 
+                        with each URI and location read; its return value
+                        will be saved as the location for the URI.
     :return dict: containing the parsed mappings
 
     :exc `ValueError` if the stream does not contain valid JSON or 
                       otherwise contains data that cannot be coverted to
                       a dictionary.
     """
-    return json.load(fd)
+    if ijson and _stream_size(fd) > STREAM_PARSE_THRESHOLD:
+        # avoid holding the whole document text in memory alongside the 
+        # resulting dictionary
+        items = ijson.kvitems(getattr(fd, 'buffer', fd), '')
+        try:
+            if transform:
+                return dict((u, transform(u, l)) for u, l in items)
+            return dict(items)
+        except ijson.JSONError as ex:
+            raise ValueError(str(ex))
 
-def parse_mappings_astxt(fd):
+    out = json.loads(fd.read())
+    if transform:
+        # (only the top-level values are locations)
+        if not isinstance(out, dict):
+            raise ValueError("JSON content is not an object")
+        return dict((u, transform(u, l)) for u, l in out.items())
+    return out
+
+def _stream_size(fd):
+    try:
+        return os.fstat(fd.fileno()).st_size
+    except (OSError, ValueError):
+        # not backed by a real file (e.g. StringIO)
+        return 0
+
+def parse_mappings_astxt(fd, transform=None):
     """
     read the locations contained in the given file stream.  The expected
     format is simple plain-text in which each line contains a single 
@@ -35,25 +76,84 @@ def parse_mappings_astxt(fd):
 
     :argument file fd:  the file stream object containing the data in 
                         text format
+    :argument func transform:  if provided, a function that will be called 
+                        with each URI and location read; its return value
+                        will be saved as the location for the URI.
 
     :exc `ValueError` if a non-empty, non-comment record in the file does 
                       not contain at least 2 space delimited words.
     """
+    # read it all at once rather than line-by-line
     out = {}
-    for line in fd:
-        line = line.strip()
-        if len(line) == 0 or line[0] == '#':
+    for line in fd.read().splitlines():
+        # only the first two words matter; don't split the rest of the line
+        words = line.split(None, 2)
+        if not words or words[0][0] == '#':
             continue
 
-        uri, loc = line.split()[0:2]
-        out[uri] = loc
+        uri, loc = words[0:2]
+        out[uri] = transform(uri, loc) if transform else loc
 
     return out
 
+def parse_mappings_asmsgpack(fd, transform=None):
+    """
+    read the locations contained in the given file stream.  The format 
+    should be a MessagePack-encoded map whose keys are the URIs and their 
+    values the corresponding file paths where the schema for each URI is 
+    located.  (This requires the msgpack package.)
+
+    :argument file fd:  the file stream object (opened in binary mode) 
+                        containing the data in MessagePack format
+    :argument func transform:  if provided, a function that will be called 
+                        with each URI and location read; its return value
+                        will be saved as the location for the URI.
+    :return dict: containing the parsed mappings
+
+    :exc `ValueError` if the stream does not contain valid MessagePack data
+                      that can be coverted to a dictionary.
+    :exc `RuntimeError` if the msgpack package is not available.
+    """
+    if not msgpack:
+        raise RuntimeError("msgpack package is not available to read " +
+                           "location file in msgpack format")
+    try:
+        out = msgpack.unpackb(fd.read(), raw=False)
+    except Exception as ex:
+        raise ValueError("MessagePack content error: " + str(ex))
+    if not isinstance(out, dict):
+        raise ValueError("MessagePack content is not a map")
+
+    if transform:
+        return dict((u, transform(u, l)) for u, l in out.items())
+    return out
+
 _parsers = { "json": parse_mappings_asjson,
-             "txt": parse_mappings_astxt    }
+             "txt": parse_mappings_astxt,
+             "msgpack": parse_mappings_asmsgpack }
+
+# the parsers that can apply a location transform as they read
+_transforming = set(_parsers.values())
+
+# the parsers that read a binary (rather than a text) stream
+_binary = { parse_mappings_asmsgpack }
+
+# a MessagePack map starts with one of these bytes (a fixmap, map 16, or 
+# map 32); none can start a JSON document
+_msgpack_map_starts = frozenset(range(0x80, 0x90)) | { 0xde, 0xdf }
+
+def _sniff_parser(fd, parser):
+    # return the parser to use for a JSON or MessagePack location file based 
+    # on its first byte, so that either can be read whatever its name 
+    # (e.g. a MessagePack file written as JSON for lack of msgpack)
+    if parser is parse_mappings_asjson or parser is parse_mappings_asmsgpack:
+        head = fd.peek(1)[:1]
+        if head and head[0] in _msgpack_map_starts:
+            return parse_mappings_asmsgpack
+        return parse_mappings_asjson
+    return parser
 
-def register_location_file_parser(ext, parser):
+def register_location_file_parser(ext, parser, supports_transform=False):
     """
     register a location file parser to handle files with a given filename 
     extension.
@@ -63,9 +163,33 @@ def register_location_file_parser(ext, parser):
                         with this extension will be parsed with the given 
                         parser.
     :argument func parser:  a function to invoke as a parser for files of 
-                        the given extension.  
+                        the given extension.  It should accept the open file
+                        stream and return a dictionary of the mappings.  If 
+                        it also accepts a transform keyword argument (like 
+                        parse_mappings_astxt()), it should be registered 
+                        with supports_transform=True.
+    :argument bool supports_transform:  True if the parser accepts the 
+                        transform keyword argument.
     """
-    _parsers.set(ext, func)
+    _parsers[ext] = parser
+    if supports_transform:
+        _transforming.add(parser)
+    else:
+        _transforming.discard(parser)
+
+_seps = os.sep + (os.altsep or '')
+
+def _extension(path):
+    # the filename extension (without the dot) or an empty string; this
+    # matches os.path.splitext(path)[1][1:] with a single scan of path
+    head, dot, ext = path.rpartition('.')
+    if not dot or os.sep in ext or (os.altsep and os.altsep in ext):
+        return ''
+    head = head.rstrip('.')
+    if not head or head[-1] in _seps:
+        # leading dots of a filename don't start an extension
+        return ''
+    return ext
 
 class LocationReader(object):
     """
@@ -111,7 +235,7 @@ class LocationReader(object):
             basedir = os.path.abspath(os.path.dirname(locfile))
 
         if not fmt:
-            fmt = os.path.splitext(locfile)[1][1:]
+            fmt = _extension(locfile)
         if not fmt:
             fmt = self.deffmt
 
@@ -124,20 +248,34 @@ class LocationReader(object):
             raise RuntimeError("Don't know how to parse location file of " +
                                "type '" + fmt + "'")
 
-        # parse the file
-        with open(locfile) as fd:
-            out =u2l(fd)
-
         # turn simple file URIs into paths; turn relative paths into 
         # absolute ones
-        for uri, loc in out.items():
-            locurl = urlparse(loc, scheme='file')
-            if locurl.scheme == 'file' and not locurl.netloc:
+        if basedir:
+            basedir = os.path.abspath(basedir)
+        def fixloc(uri, loc):
+            if ':' in loc:
+                locurl = urlsplit(loc, scheme='file')
+                if locurl.scheme != 'file' or locurl.netloc:
+                    return loc
                 loc = locurl.path
-                if basedir:
-                    loc = os.path.abspath(os.path.join(basedir, loc))
-                out[uri] = loc
+            # else a plain file path (the common case), no URL parsing needed
 
+            if basedir:
+                loc = os.path.normpath(os.path.join(basedir, loc))
+            return loc
+
+        # parse the file, fixing the locations as they are read if the 
+        # parser supports it
+        with open(locfile, 'rb') as fd:
+            u2l = _sniff_parser(fd, u2l)
+            if u2l not in _binary:
+                fd = io.TextIOWrapper(fd)
+            if u2l in _transforming:
+                return u2l(fd, transform=fixloc)
+            out = u2l(fd)
+
+        for uri, loc in out.items():
+            out[uri] = fixloc(uri, loc)
         return out
 
 def read_loc_file(locfile, fmt=None, basedir=None):
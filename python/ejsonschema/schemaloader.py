@@ -4,7 +4,11 @@ cached on local disk.
 """
 from __future__ import with_statement
 import six
-import sys, os, json, errno
+import sys, os, re, json, errno, stat, mmap, weakref, codecs, hashlib
+from collections import deque
+from types import MappingProxyType
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 try:
     from collections.abc import Mapping
 except ImportError:
@@ -19,30 +23,180 @@ except ImportError:
 import jsonschema as jsch
 
 from .location import read_loc_file
+from ._support import orjson, requests, _loads, _dumps, _http_session
 
 try:
-    import requests
+    import msgpack
 except ImportError:
-    requests = None
+    msgpack = None
 
 SCHEMA_LOCATION_FILE = "schemaLocation.json"
+SCHEMA_LOCATION_CACHE = ".schemaLocationCache.json"
+
+# the recognized JSON-Schema $schema URIs.  jsonschema's own registry 
+# normalizes the URI on every lookup; this is consulted only on a miss (for 
+# URIs written in another form or validators registered since import).
+_meta_schema_uris = frozenset(jsch.validators.meta_schemas) | \
+                    frozenset(uri+'#' for uri in jsch.validators.meta_schemas)
+
+def _is_meta_schema(uri):
+    return uri in _meta_schema_uris or uri in jsch.validators.meta_schemas
+
+# files larger than this are memory-mapped for parsing (when orjson is 
+# available) rather than read into memory
+MMAP_THRESHOLD = 64 * 1024
+
+# matches the start of a JSON object (after an optional UTF-8 BOM)
+_object_start = re.compile(br'(?:\xef\xbb\xbf)?\s*\{')
+
+def _parse_file(path, marker=None):
+    # parse the JSON file at the given path.  If marker (bytes) is given, the
+    # file is expected to contain a JSON object that includes the marker; 
+    # None is returned without parsing if it evidently does not.  Schema
+    # files are usually small, so they are read with a single unbuffered 
+    # read() of the file's size; larger files are parsed in place from a 
+    # memory map when orjson (which accepts a memoryview) is available.  
+    # Numbers parse as they would with the json module (see _support._loads).
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if orjson and size > MMAP_THRESHOLD:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                if marker and (not _object_start.match(mm) or 
+                               mm.find(marker) < 0):
+                    return None
+                with memoryview(mm) as view:
+                    return _loads(view)
+
+        data = os.read(fd, size)
+        while len(data) < size:
+            more = os.read(fd, size - len(data))
+            if not more:
+                break
+            data += more
+    finally:
+        os.close(fd)
 
-_schema_schemaLoader = None
-def schemaLoader_for_schemas():
-    global _schema_schemaLoader
-    if not _schema_schemaLoader:
-        schemadir = os.path.join(os.path.dirname(__file__),
-                                 "resources", "schemas")
-        if not os.path.exists(schemadir):
-            fromsrc = os.path.join(os.path.dirname(os.path.dirname(
-                                    os.path.dirname(os.path.abspath(__file__)))),
-                                   "schemas")
-            if os.path.exists(fromsrc):
-                schemadir = fromsrc
-            
-        _schema_schemaLoader = SchemaLoader.from_directory(schemadir)
+    if marker and (not _object_start.match(data) or marker not in data):
+        return None
+    return _loads(data)
+
+class _PooledSchema(dict):
+    # a parsed schema that can be held in the (weak-valued) schema pool
+    pass
+
+# schemas parsed from files, shared by all SchemaLoaders while in use; keys
+# are the file's real path, modification time, and size.
+_schema_pool = weakref.WeakValueDictionary()
+
+def clear_schema_pool():
+    """
+    empty the process-wide pool of schemas parsed from files, which allows
+    SchemaLoaders to share the schemas they load.  Loaders will still keep
+    the schemas they have already loaded; see SchemaLoader.clear_cache().
+    """
+    _schema_pool.clear()
 
-    return _schema_schemaLoader
+_local_prefixes = ('/', '.', os.sep)
+_http_schemes = ("http", "https")
+
+@lru_cache(maxsize=1)
+def schemaLoader_for_schemas():
+    """
+    return the SchemaLoader for the schemas that ship with this package 
+    (including the JSON Schema and EJS meta-schemas).  The same loader is 
+    returned by every call, so it is frozen (see SchemaLoader.freeze()); 
+    use copy_locations_from() to build on it.
+    """
+    schemadir = os.path.join(os.path.dirname(__file__), "resources", "schemas")
+    if not os.path.exists(schemadir):
+        fromsrc = os.path.join(os.path.dirname(os.path.dirname(
+                                os.path.dirname(os.path.abspath(__file__)))),
+                               "schemas")
+        if os.path.exists(fromsrc):
+            schemadir = fromsrc
+
+    out = SchemaLoader.from_directory(schemadir)
+    out.freeze()
+    return out
+
+# matches a JSON string or a single non-whitespace JSON token
+_json_token = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]:,]|[^\s"{}\[\]:,]+')
+_id_props = ("$schema", "id")
+
+# the amount of a file to scan for ids before reading the rest
+_HEAD_SIZE = 8192
+
+def _scan_ids(text):
+    """
+    scan JSON text for the string values of the top-level "$schema" and "id"
+    properties without parsing the rest of the document.  Scanning stops as
+    soon as both are found.  
+
+    :return tuple:  a 2-tuple containing a dictionary of the properties 
+                    found and a boolean that is True if the result is 
+                    definitive--that is, both properties were found or the 
+                    end of the top-level object was reached.  None is 
+                    returned if the text does not start with a JSON object.
+    """
+    found = {}
+    tokens = _json_token.finditer(text)
+    first = next(tokens, None)
+    if not first or first.group() != '{':
+        return None
+
+    depth = 1
+    key = None
+    want_key = True
+    for m in tokens:
+        tok = m.group()
+        if depth > 1:
+            # skip over the contents of nested objects and arrays
+            if tok == '{' or tok == '[':
+                depth += 1
+            elif tok == '}' or tok == ']':
+                depth -= 1
+            continue
+
+        if tok == '}':
+            return (found, True)
+        if tok == ',':
+            want_key = True
+        elif tok == ':':
+            pass
+        elif want_key:
+            key = json.loads(tok) if '\\' in tok else tok[1:-1]
+            want_key = False
+        elif tok == '{' or tok == '[':
+            depth += 1
+        elif key in _id_props and tok[0] == '"':
+            found[key] = json.loads(tok)
+            if len(found) == len(_id_props):
+                return (found, True)
+
+    # ran out of text before the end of the object
+    return (found, False)
+
+_scheme_re = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*:')
+
+_schemes_by_prefix = {}
+
+def _scheme_of(uri):
+    # the (lower-cased) URI scheme, as urlparse() would find it.  A URI's 
+    # scheme depends only on what precedes its first colon, and few distinct
+    # such prefixes are expected, so results are remembered by prefix.
+    idx = uri.find(':')
+    if idx < 0:
+        return ''
+    prefix = uri[:idx]
+    scheme = _schemes_by_prefix.get(prefix)
+    if scheme is None:
+        m = _scheme_re.match(uri)
+        scheme = m.group()[:-1].lower() if m else ''
+        if len(_schemes_by_prefix) >= 256:
+            _schemes_by_prefix.clear()
+        _schemes_by_prefix[prefix] = scheme
+    return scheme
 
 class BaseSchemaLoad(object):
 
@@ -76,23 +230,36 @@ class SchemaLoader(BaseSchemaLoad):
     jsonschema.RefResolver instance; see SchemaHandler.
     """
 
-    def __init__(self, urilocs={}):
+    def __init__(self, urilocs=None):
         """
         initialize the handler
 
         :argument dict urilocs:  a dictionary mapping URIs to local file paths
                                  that define the schema identified by the URI.
         """
-        self._map = dict(urilocs)
+        self._map = dict(urilocs) if urilocs else {}
+        self._frozen = False
+
+        # parsed schemas previously loaded; each value is a 2-tuple of the 
+        # local file's (mtime, size) stamp when read (None for remote 
+        # schemas) and the parsed schema
+        self._cache = {}
 
         # the following are used to support SchemaHandler; may be removed if 
         # SchemaHandler is not required for RefResolver
         self._schemes = set()
-        self._addschemes(urilocs)
+        self._addschemes(self._map)
+
+    def _check_mutable(self):
+        # make sure locations can be added
+        if self._frozen:
+            raise RuntimeError("SchemaLoader is frozen; locations cannot "+
+                               "be added")
 
     @classmethod
     def from_directory(cls, dirpath, ensure_locfile=False, 
-                       locfile=SCHEMA_LOCATION_FILE):
+                       locfile=SCHEMA_LOCATION_FILE, use_cache=False,
+                       workers=None, fast=False):
         """
         create a schemaLoader for schemas stored as files under a given 
         directory.  This factory method will attempt to load schema file 
@@ -100,11 +267,23 @@ class SchemaLoader(BaseSchemaLoad):
         If the file is not found, all the JSON files under that directory
         (including subdirectories) will be examined and those recognized as 
         JSON schemas will be loaded.  
-        """
-        if not os.path.exists(dirpath):
-            raise IOError((errno.ENOENT, "directory not found", dirpath)) 
-        if not os.path.isdir(dirpath):
-            raise RuntimeError(dirpath + ": not a directory")
+
+        :argument bool use_cache:  if True and locfile is not found, the 
+                         result of examining the files is saved to (and 
+                         subsequently reused from) a hidden cache file in 
+                         the directory until any of the JSON files change;
+                         see DirectorySchemaCache.load_or_build_cache().
+        :argument int workers:  the number of threads to use to examine the
+                         JSON files when locfile is not found; by default,
+                         they are read serially.
+        :argument bool fast:  if True and locfile is not found, the JSON 
+                         files are only scanned as far as needed to find
+                         their ids rather than fully parsed; see 
+                         DirectorySchemaCache.locations_fast() for the 
+                         consequences.  
+        """
+        # this checks that dirpath is an existing directory
+        dc = DirectorySchemaCache(dirpath, workers)
 
         out = cls()
 
@@ -112,8 +291,12 @@ class SchemaLoader(BaseSchemaLoad):
         if os.path.exists(locpath):
             out.load_locations(locpath, dirpath)
         else:
-            dc = DirectorySchemaCache(dirpath)
-            out.add_locations(dc.locations())
+            if use_cache:
+                out.add_locations(dc.load_or_build_cache(fast=fast))
+            elif fast:
+                out.add_locations(dc.locations_fast())
+            else:
+                out.add_locations(dc.locations())
             if ensure_locfile:
                 dc.save_locations(locfile)
 
@@ -135,8 +318,7 @@ class SchemaLoader(BaseSchemaLoad):
 
     def _addschemes(self, map):
         # used to support SchemaHandler
-        for loc in self._map:
-            self._schemes.add(urlparse(loc).scheme)
+        self._schemes.update(_scheme_of(uri) for uri in map)
 
     def locate(self, uri):
         """
@@ -156,12 +338,19 @@ class SchemaLoader(BaseSchemaLoad):
     def __len__(self):
         return len(self._map)
 
+    def __contains__(self, uri):
+        # True if a location is set for the given URI
+        return uri in self._map
+
     def add_location(self, uri, path):
         """
         set the location of the schema file corresponding to the given URI
         """
+        uri = sys.intern(uri)
+        self._check_mutable()
         self._map[uri] = path
-        self._schemes.add(urlparse(uri).scheme)
+        self._cache.pop(uri, None)
+        self._schemes.add(_scheme_of(uri))
 
     def add_locations(self, urifiles):
         """
@@ -169,14 +358,18 @@ class SchemaLoader(BaseSchemaLoad):
         """
 
         # strip any trailing #s from the ids
-        urilocs = {}
-        for id in urifiles:
-            outid = id
-            if id.endswith('#'):
-                outid = id.rstrip('#')
-            urilocs[outid] = urifiles[id]
-        
-        self._map.update(urilocs)
+        urilocs = dict((sys.intern(id.rstrip('#')), loc) 
+                       for id, loc in urifiles.items())
+
+        if not self._map and not self._frozen:
+            # no need to copy into an empty map
+            self._map = urilocs
+        else:
+            self._check_mutable()
+            self._map.update(urilocs)
+        if self._cache:
+            for uri in urilocs:
+                self._cache.pop(uri, None)
         self._addschemes(urilocs)
 
     def copy_locations_from(self, loader):
@@ -189,9 +382,44 @@ class SchemaLoader(BaseSchemaLoad):
         """
         self.add_locations(loader._map)
 
+    def freeze(self):
+        """
+        make the set of schema locations read-only.  Attempts to add 
+        locations afterward will raise a RuntimeError.  This is intended 
+        for loaders that are fully populated once and then shared.
+        """
+        if not self._frozen:
+            self._map = MappingProxyType(self._map)
+            self._frozen = True
+
+    @property
+    def frozen(self):
+        """
+        True if freeze() has been called on this loader
+        """
+        return self._frozen
+
+    def clear_cache(self, uri=None):
+        """
+        forget schemas previously loaded via load_schema() so that they
+        will be re-read (or re-fetched) when next requested.
+
+        :argument str uri:  the URI of the schema to forget; if not given,
+                            all schemas are forgotten.
+        """
+        if uri is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(uri.rstrip('#'), None)
+
     def load_schema(self, uri):
         """
-        return the parsed json schema document for a given URI.
+        return the parsed json schema document for a given URI.  Schemas read
+        from local files are cached: the same object is returned by later 
+        calls for the URI until the file changes (as indicated by its 
+        modification time and size)--and by other loaders reading the same
+        file--so it should not be altered.  Remote schemas are fetched only
+        once and cached likewise.  
 
         :exc `KeyError` if the location of the schema has not been set
         :exc `IOError` if an error occurs while trying to read from the 
@@ -199,28 +427,47 @@ class SchemaLoader(BaseSchemaLoad):
                        not found or reading causes a syntax error.  
         """
         loc = self.locate(uri)
-        url = urlparse(loc)
+        if loc.startswith(_local_prefixes) or loc[1:2] == ':':
+            # clearly a local (absolute, relative, or Windows drive) path
+            scheme = ''
+        else:
+            scheme = urlparse(loc).scheme
 
         # Note: this part adapted from jsonschema.RefResolver.resolve_remote()
         # (v2.5.1)
-        if not url.scheme:
-            with open(loc) as fd:
-                return json.load(fd)
-        elif (
-            scheme in [u"http", u"https"] and
-            requests and
-            getattr(requests.Response, "json", None) is not None
-        ):
-            # Requests has support for detecting the correct encoding of
-            # json over http
-            if callable(requests.Response.json):
-                result = requests.get(loc).json()
-            else:
-                result = requests.get(loc).json
+        if not scheme:
+            st = os.stat(loc)
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = self._cache.get(uri)
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+            # another loader may already have read this file
+            key = (os.path.realpath(loc),) + stamp
+            result = _schema_pool.get(key)
+            if result is None:
+                result = _parse_file(loc)
+                if isinstance(result, dict):
+                    result = _PooledSchema(result)
+                    _schema_pool[key] = result
+            self._cache[uri] = (stamp, result)
+            return result
+
+        # remote schemas are fetched only once
+        cached = self._cache.get(uri)
+        if cached:
+            return cached[1]
+
+        if scheme in _http_schemes and requests:
+            # parse the raw body in one pass; the parser detects the 
+            # encoding itself (rather than Response.json() decoding to 
+            # text first)
+            result = _loads(_http_session().get(loc).content)
         else: 
-            # Otherwise, pass off to urllib and assume utf-8
-            result = json.loads(urlopen(uri).read().decode("utf-8"))
+            # Otherwise, pass off to urllib
+            result = _loads(urlopen(loc).read())
 
+        self._cache[uri] = (None, result)
         return result
 
     def load_locations(self, filename, basedir=None):
@@ -249,17 +496,23 @@ class SchemaHandler(Mapping):
         """
         self._loader = loader
         self._strict = strict
+
+        # the loader updates this set in place as locations are added
+        self._schemes = getattr(loader, "_schemes", None)
             
     def __getitem__(self, scheme):
-        if self._strict and scheme not in self._loader._schemes:
+        if self._strict and scheme not in self._schemes:
             raise KeyError(scheme)
         return self._loader
 
+    def __contains__(self, scheme):
+        return not self._strict or scheme in self._schemes
+
     def __len__(self):
-        return len(self._loader._schemes)
+        return len(self._schemes)
 
     def __iter__(self):
-        return self._loader._schemes.__iter__()
+        return iter(self._schemes)
 
 
 class DirectorySchemaCache(object):
@@ -305,29 +558,40 @@ class DirectorySchemaCache(object):
                 out += ": " + self.why
             return out
 
-    def __init__(self, dirpath):
+    def __init__(self, dirpath, workers=None):
+        """
+        initialize the cache
+
+        :argument str dirpath:  the path to the directory containing the 
+                                schema files
+        :argument int workers:  the number of threads to use to read the 
+                                files in the directory; if not greater than
+                                one (the default), files are read serially.
+        """
         self._dir = dirpath
+        self._workers = workers or 1
         self._checkdir()
 
+        # the results of previous full scans, keyed by whether the scan was
+        # recursive; each value is a 2-tuple of the directory's fingerprint
+        # at the time of the scan and the list of _iterfiles() tuples
+        self._scanned = {}
+
     def _checkdir(self):
-        if not os.path.exists(self._dir):
+        try:
+            mode = os.stat(self._dir).st_mode
+        except OSError:
             raise IOError((errno.ENOENT, "directory not found", self._dir)) 
-        if not os.path.isdir(self._dir):
+        if not stat.S_ISDIR(mode):
             raise RuntimeError(self._dir + ": not a directory")
 
-    def _read_id(self, fd):
-        try:
-            schema = json.load(fd)
-        except Exception as ex:
-            # JSON syntax error (most likely)
-            raise self.NotASchemaError("JSON content error: " + str(ex))
-        
+    def _schema_id(self, schema):
         if not hasattr(schema, "get") or not hasattr(schema,"__getitem__"):
             raise self.NotASchemaError("Does not contain a JSON object")
         
         try:
             sid = schema["$schema"]
-            if sid not in jsch.validators.meta_schemas:
+            if not _is_meta_schema(sid):
                 raise self.NotASchemaError("Unrecognized JSON-Schema $schema")
         except KeyError:
             raise self.NotASchemaError("JSON object does not contain a $schema property")
@@ -337,36 +601,203 @@ class DirectorySchemaCache(object):
     def open_file(self, filename):
         """
         read the file in the cache directory with the given filename and 
-        return 2-tuple of the schema's id and the parsed schema
+        return 2-tuple of the schema's id and the parsed schema.  If the 
+        unchanged file was already parsed (by this or any SchemaLoader), 
+        the same schema object is returned, so it should not be altered.
         """
-        filepath = os.path.join(self._dir, filename)
-        with open(filepath) as fd:
+        return self._open_path(os.path.join(self._dir, filename), filename)
+
+    def _open_path(self, filepath, filename):
+        # a SchemaLoader (or another cache) may already have parsed this file
+        st = os.stat(filepath)
+        key = (os.path.realpath(filepath), st.st_mtime_ns, st.st_size)
+        try:
+            schema = _schema_pool.get(key)
+            if schema is None:
+                # no need to parse a file that cannot be a schema
+                try:
+                    schema = _parse_file(filepath, b'"$schema"')
+                except ValueError as ex:
+                    # JSON syntax error (most likely)
+                    raise self.NotASchemaError("JSON content error: "+str(ex))
+                if schema is None:
+                    raise self.NotASchemaError("Does not contain a JSON "+
+                                               "object with a $schema property")
+                (id, schema) = self._schema_id(schema)
+                schema = _PooledSchema(schema)
+                _schema_pool[key] = schema
+            else:
+                (id, schema) = self._schema_id(schema)
+        except self.NotASchemaError as ex:
+            ex.path = filename
+            raise
+
+        if not id:
+            id = "file://" + filepath
+
+        return (id, schema)
+
+    def _iter_json_paths(self, recurse=True):
+        # yield the relative and full paths of the JSON files in the 
+        # directory.  Like os.walk(), symbolic links to directories are not 
+        # followed.
+        dirs = deque([(self._dir, '')])
+        while dirs:
+            dir, prefix = dirs.popleft()
+            with os.scandir(dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recurse:
+                            dirs.append((entry.path, 
+                                         prefix + entry.name + os.sep))
+                    elif entry.name.endswith(".json") and entry.is_file():
+                        yield prefix + entry.name, entry.path
+
+    def _iter_stamped_paths(self, stamps, recurse=True, exclude=None):
+        # yield the relative and full paths of the JSON files in the 
+        # directory (except exclude), as _iter_json_paths() does, while 
+        # appending each one's relative path, modification time, and size 
+        # to stamps
+        for file, filepath in self._iter_json_paths(recurse):
+            if filepath == exclude:
+                continue
             try:
-                (id, schema) = self._read_id(fd)
+                st = os.stat(filepath)
+            except OSError:
+                # removed since listed
+                continue
+            stamps.append((file, st.st_mtime_ns, st.st_size))
+            yield file, filepath
+
+    @staticmethod
+    def _digest_stamps(stamps):
+        return hashlib.blake2b(repr(sorted(stamps)).encode('utf-8'), 
+                               digest_size=16).hexdigest()
+
+    def _fingerprint(self, recurse=True, exclude=None):
+        # return a digest of the relative path, modification time, and size
+        # of each of the directory's JSON files.  It changes if any are 
+        # added, removed, renamed, or modified--including being replaced by
+        # a file that is not newer.
+        stamps = []
+        for paths in self._iter_stamped_paths(stamps, recurse, exclude):
+            pass
+        return self._digest_stamps(stamps)
+
+    def _apply(self, func, recurse=True, paths=None):
+        # yield the relative and full paths of each schema file with the 
+        # result of applying func to its full and relative paths, skipping 
+        # files that are not schemas or cannot be read.  The files are those
+        # given by paths (an iterable of relative and full paths) or, if 
+        # that is None, all of the JSON files in the directory.
+        if paths is None:
+            paths = self._iter_json_paths(recurse)
+
+        def apply(paths):
+            try:
+                return (paths[0], paths[1], func(paths[1], paths[0]))
+            except IOError as ex:
+                # unable to read the file (issue warning?)
+                return None
             except self.NotASchemaError as ex:
-                ex.path = filename
-                raise
+                return None
 
-            if not id:
-                id = "file://" + filepath
+        if self._workers > 1:
+            with ThreadPoolExecutor(self._workers) as pool:
+                results = list(pool.map(apply, paths))
+        else:
+            results = map(apply, paths)
 
-            return (id, schema)
+        for res in results:
+            if res:
+                yield res
 
     def _iterfiles(self, recurse=True):
-        for dir, dirnames, filenames in os.walk(self._dir):
-            dir = dir[len(self._dir)+1:]
-            for file in map(lambda p: os.path.join(dir, p), 
-                            filter(lambda f: f.endswith(".json"), filenames)):
-                try:
-                    (id, schema) = self.open_file(file)
-                    yield file, id, schema
-                except IOError as ex:
-                    # unable to read the file (issue warning?)
-                    continue
-                except self.NotASchemaError as ex:
-                    continue
-            if not recurse:
-                break
+        # reuse the previous scan if no JSON files have changed since.  (The
+        # directory is only fingerprinted up front when there is a scan to
+        # reuse; otherwise, the files are stamped as the scan reaches them.)
+        scanned = self._scanned.get(recurse)
+        if scanned and scanned[0] == self._fingerprint(recurse):
+            for item in scanned[1]:
+                yield item
+            return
+
+        stamps = []
+        files = []
+        paths = self._iter_stamped_paths(stamps, recurse)
+        for file, filepath, (id, schema) in self._apply(self._open_path, 
+                                                        recurse, paths):
+            files.append((file, filepath, id, schema))
+            yield file, filepath, id, schema
+
+        # only a completed scan is kept
+        self._scanned[recurse] = (self._digest_stamps(stamps), files)
+
+    def invalidate(self):
+        """
+        forget the results of previous scans of the directory, so that the
+        files are re-read by the next call to locations(), schemas(), etc.
+        (This is not normally necessary as scans are automatically redone 
+        when any of the JSON files are added, removed, or modified.)
+        """
+        self._scanned.clear()
+
+    def _scan_file(self, filepath, filename):
+        # return the id of the schema in the given file, looking only as far
+        # into the file as needed to find it
+        with open(filepath, 'rb') as fd:
+            # schemas usually declare these near the top, so try the head of
+            # the file first
+            data = fd.read(_HEAD_SIZE)
+        try:
+            # (the head may end in the middle of a character)
+            text = codecs.getincrementaldecoder('utf-8')().decode(data)
+        except UnicodeDecodeError as ex:
+            raise self.NotASchemaError("JSON content error: " + str(ex),
+                                       filename)
+        scanned = _scan_ids(text)
+
+        # the scan is conclusive if both ids were found or if the head is 
+        # the whole file and its top-level object ended.  (The head's end 
+        # of the object can't be trusted, as it may fall within a string.)
+        if not scanned or not (len(scanned[0]) == len(_id_props) or 
+                               (scanned[1] and len(data) < _HEAD_SIZE)):
+            # not found in the head or not well-formed; fully parsing the
+            # file is faster than scanning all of it
+            return self._open_path(filepath, filename)[0]
+
+        props = scanned[0]
+        sid = props.get("$schema")
+        if sid is None:
+            raise self.NotASchemaError(
+                "JSON object does not contain a $schema property", filename)
+        if not _is_meta_schema(sid):
+            raise self.NotASchemaError("Unrecognized JSON-Schema $schema",
+                                       filename)
+        id = props.get("id")
+
+        if not id:
+            id = "file://" + filepath
+        return id
+
+    def locations_fast(self, absolute=True, recursive=True):
+        """
+        return a dictionary that maps schema URIs to their file paths.  This
+        is equivalent to locations(); however, rather than fully parsing each
+        file, only as much of a file is scanned as is needed to find the 
+        schema's "$schema" and "id" properties.  Consequently, a file that 
+        is only broken after those properties will still be included.  
+
+        :argument bool absolute:  if True, the paths returned will be absolute;
+                                  by default (False), paths relative to the 
+                                  directory are returned. 
+        :argument bool recursive: if True (default), this list will include
+                                  schemas from subdirectories
+        """
+        # if an id ends in a #, drop it off the end
+        return dict((id.rstrip('#'), filepath if absolute else file) 
+                    for file, filepath, id in 
+                    self._apply(self._scan_file, recursive))
 
     def locations(self, absolute=True, recursive=True):
         """
@@ -378,33 +809,105 @@ class DirectorySchemaCache(object):
         :argument bool recursive: if True (default), this list will include
                                   schemas from subdirectories
         """
-        out = {}
-        for file, id, schema in self._iterfiles(recursive):
-            if absolute:
-                file = os.path.join(self._dir, file)
+        return dict(self.iter_locations(absolute, recursive))
 
-            # if id ends in a #, drop it off the end
-            if id.endswith('#'):
-                id = id.rstrip('#')
-            out[id] = file
+    def iter_locations(self, absolute=True, recursive=True):
+        """
+        iterate through the schemas in the directory, returning for each a
+        2-tuple of its URI and its file path, as in locations().  Unless the
+        cache was created with multiple workers (or the directory was 
+        already scanned), each file is read only as it is reached.
 
-        return out
+        :argument bool absolute:  if True, the paths returned will be absolute;
+                                  by default (False), paths relative to the 
+                                  directory are returned. 
+        :argument bool recursive: if True (default), this will include
+                                  schemas from subdirectories
+        """
+        # if an id ends in a #, drop it off the end
+        for file, filepath, id, schema in self._iterfiles(recursive):
+            yield id.rstrip('#'), filepath if absolute else file
 
     def schemas(self, recursive=True):
         """
-        return a dictionary of mappings of URIs to parsed schemas
+        return a dictionary of mappings of URIs to parsed schemas.  The 
+        parsed schemas are retained for later calls, so they should not be
+        altered.
 
         :argument bool recursive: if True (default), this list will include
                                   schemas from subdirectories
         """
-        out = {}
-        for file, id, schema in self._iterfiles(recursive):
-            out[id] = schema
+        return dict(self.iter_schemas(recursive))
 
-        return out
+    def iter_schemas(self, recursive=True):
+        """
+        iterate through the schemas in the directory, returning for each a 
+        2-tuple of its URI and the parsed schema.  Unless the cache was 
+        created with multiple workers, each file is read only as it is 
+        reached.
+
+        :argument bool recursive: if True (default), this will include
+                                  schemas from subdirectories
+        """
+        for file, filepath, id, schema in self._iterfiles(recursive):
+            yield id, schema
+
+    def load_or_build_cache(self, cachefile=SCHEMA_LOCATION_CACHE, 
+                            absolute=True, recursive=True, fast=False):
+        """
+        return a dictionary that maps schema URIs to their file paths, like 
+        locations(), using a previously saved copy of the map if none of
+        the JSON files in the directory have changed since it was saved.  
+        Otherwise, the map is built by scanning the files and saved for 
+        the next call.  (Failing to save it is not an error.)
+
+        :argument str cachefile:  the name of the file to save the map in.  A
+                     relative path will be interpreted as relative to the 
+                     cache directory.  
+        :argument bool absolute:  if True, the paths returned will be absolute;
+                                  by default (False), paths relative to the 
+                                  directory are returned. 
+        :argument bool recursive: if True (default), this list will include
+                                  schemas from subdirectories
+        :argument bool fast:      if True, the map is built with 
+                                  locations_fast() rather than locations().
+                                  A saved map is only reused by calls 
+                                  that set this the same way.
+        """
+        cachefile = os.path.join(self._dir, cachefile)
+        fingerprint = self._fingerprint(recursive, cachefile)
+        locs = None
+        try:
+            with open(cachefile, 'rb') as fd:
+                cached = _loads(fd.read())
+            if cached["fingerprint"] == fingerprint and \
+               cached["fast"] == bool(fast) and \
+               isinstance(cached["locations"], dict):
+                locs = cached["locations"]
+        except (IOError, ValueError, TypeError, KeyError):
+            # missing or unusable; rebuild it
+            pass
+
+        if locs is None:
+            if fast:
+                locs = self.locations_fast(False, recursive)
+            else:
+                locs = self.locations(False, recursive)
+            try:
+                with open(cachefile, 'wb') as fd:
+                    fd.write(_dumps({"fingerprint": fingerprint,
+                                     "fast": bool(fast), "locations": locs}))
+            except IOError:
+                pass
+
+        if absolute:
+            # the saved paths are all relative to the directory
+            prefix = os.path.join(self._dir, '')
+            locs = dict((id, prefix + file) for id, file in locs.items())
+        return locs
 
     def save_locations(self, outfile=SCHEMA_LOCATION_FILE, 
-                       absolute=False, recursive=True):
+                       absolute=False, recursive=True, fmt="json"):
         """
         write the id-location map to a file (in JSON format).  
 
@@ -419,10 +922,31 @@ class DirectorySchemaCache(object):
                                   directory are returned. 
         :argument bool recursive: if True (default), this list will include
                                   schemas from subdirectories
-        """
+        :argument str fmt:  the format to write, either "json" (default) or
+                            "msgpack".  If the msgpack package is not 
+                            available, JSON is written instead; either 
+                            way, the file can be read back (see 
+                            SchemaLoader.from_location_file()) as long as 
+                            its extension is .json or .msgpack.
+
+        :exc `RuntimeError` if the format is not supported.
+        """
+        if fmt == "msgpack":
+            if not msgpack:
+                fmt = "json"
+        elif fmt != "json":
+            raise RuntimeError("Don't know how to write location file of " +
+                               "type '" + fmt + "'")
+
         outfile = os.path.join(self._dir, outfile)
 
         locs = self.locations(absolute, recursive)
 
-        with open(outfile, "w") as fd:
-            json.dump(locs, fd, separators=(",", ": "), indent=4)
+        # encode it all first and write it at once
+        if fmt == "msgpack":
+            data = msgpack.packb(locs, use_bin_type=True)
+        else:
+            data = json.dumps(locs, separators=(",", ": "), 
+                              indent=4).encode("utf-8")
+        with open(outfile, "wb") as fd:
+            fd.write(data)
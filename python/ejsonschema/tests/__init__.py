@@ -1,7 +1,10 @@
 """
 ejsonschema submodule tests
 """
-import os, shutil
+import os, json, shutil
+from functools import lru_cache
+
+from .._support import _loads
 
 tmpname = "_test"
 
@@ -38,6 +41,18 @@ def tmpdir(basedir=None, dirname=None):
         basedir = os.getcwd()
     return os.path.join(basedir, dirname)
 
+@lru_cache(maxsize=None)
+def load_json(path):
+    """
+    return the parsed contents of the given JSON file.  The file is read 
+    only once per test session, so the returned data is shared and should 
+    not be altered (copy it first if necessary).
+
+    :argument str path:  the path to the (unchanging) JSON file
+    """
+    with open(path, 'rb') as fd:
+        return _loads(fd.read())
+
 def rmdir(dirpath):
     """
     remove the given path and all its contents
@@ -1,14 +1,15 @@
 from __future__ import with_statement
-import os, pytest
+import os
 
 testroot = os.path.abspath(os.path.dirname(__file__))
+distroot = os.path.dirname(os.path.dirname(os.path.dirname(testroot)))
 
 # try resource_dir as ejsonschema/resources
 installed_resource_dir = os.path.join(os.path.dirname(testroot), 'resources')
 resource_dir = installed_resource_dir
 if not os.path.exists(resource_dir):
     # try resource_dir as the root of the distribution directory
-    resource_dir = os.path.dirname(os.path.dirname(os.path.dirname(testroot)))
+    resource_dir = distroot
 
 if not os.path.exists(resource_dir):
     raise RuntimeError("Unable to find resources directory either as " +
@@ -19,9 +20,7 @@ if not os.path.exists(resource_dir):
 schema_dir = os.path.join(resource_dir, "schemas")
 if not os.path.exists(schema_dir):
     # try schema_dir as schemas under the root of the distribution directory 
-    schema_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(testroot))), "schemas"
-    )
+    schema_dir = os.path.join(distroot, "schemas")
 if not os.path.exists(schema_dir):
     raise RuntimeError("Unable to find schemas directory either as " +
                        os.path.join(resource_dir, 'schemas') + " or " +
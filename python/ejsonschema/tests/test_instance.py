@@ -1,9 +1,9 @@
 # import pytest
 from __future__ import with_statement
-import json, os, pytest, shutil
-from io import StringIO
+import os
 
 import ejsonschema.instance as instance
+from . import load_json
 
 from .config import examples_dir as exdir
 exfile = os.path.join(exdir, "ipr.json")
@@ -12,9 +12,7 @@ assert os.path.exists(exfile), exfile + ": example file not found"
 class TestInstance(object):
 
     def test_properties(self):
-        data = None
-        with open(exfile) as fd:
-            data = json.load(fd)
+        data = load_json(exfile)
 
         inst = instance.Instance(data, exfile)
 
@@ -31,6 +29,23 @@ class TestInstance(object):
         assert inst.pointer == "/"
         assert "id" in inst.data
 
+    def test_fromlocation_remote(self, monkeypatch):
+        with open(exfile, 'rb') as fd:
+            content = fd.read()
+        class FakeResponse(object):
+            pass
+        class FakeSession(object):
+            def get(self, url):
+                resp = FakeResponse()
+                resp.content = content
+                return resp
+        session = FakeSession()
+        monkeypatch.setattr(instance, "_http_session", lambda: session)
+
+        inst = instance.Instance.from_location("http://example.com/ipr.json")
+        assert inst.source_location == "http://example.com/ipr.json"
+        assert inst.source_id == "urn:nist.gov/nmrr/ipr"
+
     def test_find_data_by_name(self):
         inst = instance.Instance.from_location(exfile)
 
@@ -109,6 +124,26 @@ class TestInstance(object):
         assert "ms:MaterialScience" in found[path][instance.DEF_EXTSCHEMAS]
         assert len(found[path][instance.DEF_EXTSCHEMAS]) == 1
 
+    def test_find_obj_by_prop_order(self):
+        data = { "a": { "x": 1, "b": [ { "x": 2 }, 3, { "c": { "x": 4 } } ] },
+                 "d": { "x": 5 }, "x": 0 }
+        found = instance.Instance(data).find_obj_by_prop("x")
+        assert [p for p, obj in found] == \
+            [ "/", "/a", "/a/b/0", "/a/b/2/c", "/d" ]
+        assert [obj["x"] for p, obj in found] == [ 0, 1, 2, 4, 5 ]
+
+    def test_find_obj_by_prop_deep(self):
+        # deeper than the interpreter's recursion limit
+        data = node = {}
+        for i in range(5000):
+            node["n"] = {}
+            node = node["n"]
+        node[instance.DEF_EXTSCHEMAS] = []
+        found = instance.Instance(data).find_extended_objs()
+        assert len(found) == 1
+        assert found[0][0] == "/n" * 5000
+        assert found[0][1] is node
+
     def test_extract(self):
         inst = instance.Instance.from_location(exfile)
 
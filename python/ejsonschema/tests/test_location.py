@@ -1,6 +1,6 @@
 # import pytest
 from __future__ import with_statement
-import json, os, pytest
+import os, pytest
 from io import StringIO
 
 import ejsonschema.location as location
@@ -46,11 +46,74 @@ def test_parse_mappings_astxt():
       assert data.get("uri:nist.gov/goober") == "http://www.ivoa.net/xml/goober"
       assert data.get("http://mgi.nist.gov/goof") == "goof.xml"
 
+def test_parse_mappings_transform():
+    upper = lambda uri, loc: loc.upper()
+    with open(txtfile) as fd:
+      data = location.parse_mappings_astxt(fd, transform=upper)
+      assert data.get("http://mgi.nist.gov/goof") == "GOOF.XML"
+    with open(jsonfile) as fd:
+      data = location.parse_mappings_asjson(fd, transform=upper)
+      assert data.get("http://mgi.nist.gov/goof") == "GOOF.XML"
+
+def test_parse_mappings_transform_toplevel(tmp_path):
+    # only the top-level values get transformed
+    path = tmp_path / "nested.json"
+    path.write_text('{ "urn:a": "a.json", "urn:b": { "urn:c": "c.json" } }')
+    mark = lambda uri, loc: (uri, loc)
+    with open(path) as fd:
+        data = location.parse_mappings_asjson(fd, transform=mark)
+    assert data == { "urn:a": ("urn:a", "a.json"),
+                     "urn:b": ("urn:b", { "urn:c": "c.json" }) }
+
+    with pytest.raises(ValueError):
+        location.parse_mappings_asjson(StringIO("[]"), transform=mark)
+
+def test_parse_mappings_asjson_streamed(tmp_path, monkeypatch):
+    pytest.importorskip("ijson")
+    monkeypatch.setattr(location, "STREAM_PARSE_THRESHOLD", 0)
+    upper = lambda uri, loc: loc.upper()
+
+    with open(jsonfile) as fd:
+        data = location.parse_mappings_asjson(fd)
+    assert len(data) == 2
+    assert data.get("http://mgi.nist.gov/goof") == "goof.xml"
+    with open(jsonfile) as fd:
+        data = location.parse_mappings_asjson(fd, transform=upper)
+    assert data.get("http://mgi.nist.gov/goof") == "GOOF.XML"
+
+    rdr = location.LocationReader()
+    data = rdr.read(jsonfile, basedir="/etc")
+    assert data.get("http://mgi.nist.gov/goof") == "/etc/goof.xml"
+
+    with open(txtfile) as fd:
+        with pytest.raises(ValueError):
+            location.parse_mappings_asjson(fd)
+
+def test_register_location_file_parser():
+    parser = lambda fd: location.parse_mappings_astxt(fd)
+    location.register_location_file_parser("loc", parser)
+    try:
+        assert location._parsers["loc"] is parser
+
+        # parsers not registered as transforming get their results fixed
+        # afterward
+        data = location.LocationReader().read(txtfile, fmt='loc', 
+                                              basedir="/etc")
+        assert data.get("uri:nist.gov/goober") == "http://www.ivoa.net/xml/goober"
+        assert data.get("http://mgi.nist.gov/goof") == "/etc/goof.xml"
+    finally:
+        del location._parsers["loc"]
+
 def test_bad_parse_mappings_astxt():
     with open(jsonfile) as fd:
         with pytest.raises(ValueError):
             data = location.parse_mappings_astxt(fd)
 
+def test_extension():
+    for path in ["loc.json", "a/b.c.txt", "loc", "a.d/loc", ".json", "a/.json",
+                 "a/..json", "loc."]:
+        assert location._extension(path) == os.path.splitext(path)[1][1:]
+
 class TestLocationReader(object):
 
     def test_ctor(self):
@@ -158,6 +221,43 @@ class TestLocationReader(object):
         assert data.get("http://mgi.nist.gov/goof") == \
             os.path.join(datadir,"goof.xml")
 
+    def test_read_msgpack(self, tmp_path):
+        msgpack = pytest.importorskip("msgpack")
+        locs = { "uri:nist.gov/goober": "http://www.ivoa.net/xml/goober",
+                 "http://mgi.nist.gov/goof": "goof.xml" }
+        rdr = location.LocationReader()
+
+        # the format is sniffed from the content, whatever the extension
+        for name in ("loc.msgpack", "loc.json"):
+            path = tmp_path / name
+            path.write_bytes(msgpack.packb(locs, use_bin_type=True))
+            data = rdr.read(str(path), basedir="/etc")
+            assert len(data) == 2
+            assert data.get("uri:nist.gov/goober") == \
+                "http://www.ivoa.net/xml/goober"
+            assert data.get("http://mgi.nist.gov/goof") == "/etc/goof.xml"
+
+        path.write_bytes(msgpack.packb(["goof.xml"]))
+        with pytest.raises(ValueError):
+            rdr.read(str(path))
+
+    def test_read_sniffed(self, tmp_path, monkeypatch):
+        rdr = location.LocationReader()
+
+        # JSON content in a file named for MessagePack
+        path = tmp_path / "loc.msgpack"
+        with open(jsonfile) as fd:
+            path.write_text(fd.read())
+        data = rdr.read(str(path), basedir="/etc")
+        assert len(data) == 2
+        assert data.get("http://mgi.nist.gov/goof") == "/etc/goof.xml"
+
+        # MessagePack content (a one-entry map) without the msgpack package
+        monkeypatch.setattr(location, "msgpack", None)
+        path.write_bytes(b'\x81\xa1a\xa1b')
+        with pytest.raises(RuntimeError):
+            rdr.read(str(path))
+
     def test_read_bad_format(self):
         rdr = location.LocationReader()
 
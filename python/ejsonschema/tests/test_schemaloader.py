@@ -1,7 +1,6 @@
 # import pytest
 from __future__ import with_statement
-import json, os, pytest, shutil
-from io import StringIO
+import json, os, math, pytest, shutil
 
 from . import Tempfiles
 import ejsonschema.schemaloader as loader
@@ -19,7 +18,7 @@ class TestSchemaLoader(object):
 
     def test_ctor(self):
         ldr = loader.SchemaLoader()
-        assert len(set(ldr.iterURIs())) == 0
+        assert len(ldr) == 0
 
         ldr = loader.SchemaLoader(locs)
         uris = set(ldr.iterURIs())
@@ -27,6 +26,20 @@ class TestSchemaLoader(object):
         assert "uri:nist.gov/goober" in uris
         assert "http://mgi.nist.gov/goof" in uris
 
+    def test_ctor_copy(self):
+        mylocs = dict(locs)
+        ldr = loader.SchemaLoader(mylocs)
+
+        # the caller's dictionary and the loader's are independent
+        mylocs["urn:gurn"] = "gurn.json"
+        assert "urn:gurn" not in ldr
+        ldr.add_location("urn:goob", "goob.json")
+        assert ldr.locate("urn:goob") == "goob.json"
+        assert "urn:goob" not in mylocs
+        ldr.add_locations({ "urn:gary": "gary.json" })
+        assert ldr.locate("urn:gary") == "gary.json"
+        assert "urn:gary" not in mylocs
+
     def test_locate(self):
         ldr = loader.SchemaLoader(locs)
         assert ldr.locate("uri:nist.gov/goober") == \
@@ -34,25 +47,26 @@ class TestSchemaLoader(object):
         assert ldr.locate("http://mgi.nist.gov/goof") == "goof.xml"
         with pytest.raises(KeyError):
             ldr.locate("ivo://ivoa.net/rofr")
+        assert "uri:nist.gov/goober" in ldr
+        assert "ivo://ivoa.net/rofr" not in ldr
 
     def test_add(self):
         ldr = loader.SchemaLoader()
-        assert len(set(ldr.iterURIs())) == 0
+        assert len(ldr) == 0
 
         ldr.add_locations(locs)
-        uris = set(ldr.iterURIs())
-        assert len(uris) == 2
+        assert len(ldr) == 2
         assert ldr.locate("uri:nist.gov/goober") == \
             "http://www.ivoa.net/xml/goober"
         assert ldr.locate("http://mgi.nist.gov/goof") == "goof.xml"
 
         ldr = loader.SchemaLoader()
         ldr.add_location("uri:nist.gov/goober", "goober.json")
-        assert len(set(ldr.iterURIs())) == 1
+        assert len(ldr) == 1
         assert ldr.locate("uri:nist.gov/goober") == "goober.json"
         ldr.add_location("http://mgi.nist.gov/goof", 
                          "http://www.ivoa.net/xml/goober")
-        assert len(set(ldr.iterURIs())) == 2
+        assert len(ldr) == 2
         assert ldr.locate("http://mgi.nist.gov/goof") == \
             "http://www.ivoa.net/xml/goober"
 
@@ -65,6 +79,99 @@ class TestSchemaLoader(object):
         assert "$schema" in schema
         assert "id" in schema
 
+    def test_load_schema_cached(self, schemafiles):
+        sfile = schemafiles("cached.json")
+        schemafiles.track("cached.json")
+        shutil.copy(schemafile, sfile)
+        ldr = loader.SchemaLoader()
+        ldr.add_location("uri:nist.gov/goober", sfile)
+
+        schema = ldr.load_schema("uri:nist.gov/goober")
+        assert ldr.load_schema("uri:nist.gov/goober") is schema
+
+        # a changed file gets re-read
+        with open(sfile, "w") as fd:
+            json.dump({ "id": "uri:nist.gov/goober" }, fd)
+        assert ldr.load_schema("uri:nist.gov/goober") == \
+            { "id": "uri:nist.gov/goober" }
+
+        schema = ldr.load_schema("uri:nist.gov/goober")
+        ldr.clear_cache()
+        loader.clear_schema_pool()
+        assert ldr.load_schema("uri:nist.gov/goober") is not schema
+        assert ldr.load_schema("uri:nist.gov/goober") == schema
+
+        schema = ldr.load_schema("uri:nist.gov/goober")
+        ldr.clear_cache("urn:goob")
+        assert ldr.load_schema("uri:nist.gov/goober") is schema
+        ldr.clear_cache("uri:nist.gov/goober")
+        loader.clear_schema_pool()
+        assert ldr.load_schema("uri:nist.gov/goober") is not schema
+
+        # so does a relocated one
+        ldr.add_location("uri:nist.gov/goober", schemafile)
+        assert "$schema" in ldr.load_schema("uri:nist.gov/goober")
+
+    def test_freeze(self):
+        ldr = loader.SchemaLoader(locs)
+        assert not ldr.frozen
+        ldr.freeze()
+        assert ldr.frozen
+        assert ldr.locate("uri:nist.gov/goober") == locs["uri:nist.gov/goober"]
+        assert len(ldr) == len(locs)
+
+        with pytest.raises(RuntimeError):
+            ldr.add_location("urn:goob", "goob.json")
+        with pytest.raises(RuntimeError):
+            ldr.add_locations({"urn:goob": "goob.json"})
+        with pytest.raises(RuntimeError):
+            ldr.copy_locations_from(loader.SchemaLoader(locs))
+        assert "urn:goob" not in ldr
+
+        # a frozen loader can still be copied from
+        ldr2 = loader.SchemaLoader()
+        ldr2.copy_locations_from(ldr)
+        assert len(ldr2) == len(locs)
+
+    def test_load_remote_schema(self, monkeypatch):
+        class Response(object):
+            content = b'{ "id": "http://example.com/goober" }'
+        class Session(object):
+            def __init__(self):
+                self.urls = []
+            def get(self, url):
+                self.urls.append(url)
+                return Response()
+        session = Session()
+        monkeypatch.setattr(loader, "_http_session", lambda: session)
+
+        ldr = loader.SchemaLoader()
+        ldr.add_location("uri:nist.gov/goober", "http://example.com/goober")
+        schema = ldr.load_schema("uri:nist.gov/goober")
+        assert schema == { "id": "http://example.com/goober" }
+        assert session.urls == [ "http://example.com/goober" ]
+        assert ldr.load_schema("uri:nist.gov/goober") is schema
+        assert len(session.urls) == 1
+
+        # other URLs are opened from the location (not the URI)
+        ldr.add_location("uri:nist.gov/goof", "file://" + schemafile)
+        schema = ldr.load_schema("uri:nist.gov/goof")
+        assert "$schema" in schema
+
+    def test_schema_pool(self):
+        ldr1 = loader.SchemaLoader()
+        ldr1.add_location("uri:nist.gov/goober", schemafile)
+        ldr2 = loader.SchemaLoader()
+        ldr2.add_location("uri:nist.gov/goof", schemafile)
+
+        schema = ldr1.load_schema("uri:nist.gov/goober")
+        assert ldr2.load_schema("uri:nist.gov/goof") is schema
+
+        loader.clear_schema_pool()
+        ldr2.clear_cache()
+        assert ldr2.load_schema("uri:nist.gov/goof") is not schema
+        assert ldr2.load_schema("uri:nist.gov/goof") == schema
+
     def test_call(self):
         ldr = loader.SchemaLoader()
         ldr.add_location("uri:nist.gov/goober", schemafile)
@@ -93,6 +200,11 @@ class TestSchemaLoader(object):
                 os.path.join(sdir, "extern", "json-schema.json")
             assert not os.path.exists(locfile)
 
+            ldr = loader.SchemaLoader.from_directory(sdir, workers=4)
+            assert len(ldr) == 2
+            assert ldr.locate("http://json-schema.org/draft-04/schema") == \
+                os.path.join(sdir, "extern", "json-schema.json")
+
             ldr = loader.SchemaLoader.from_directory(sdir, True)
             assert len(ldr) == 2
             assert ldr.locate("http://json-schema.org/draft-04/schema") == \
@@ -129,6 +241,51 @@ class TestSchemaLoader(object):
             if os.path.exists(locfile):
                 os.remove(locfile)
 
+    def test_from_directory_notdir(self):
+        with pytest.raises(IOError):
+            loader.SchemaLoader.from_directory(os.path.join(datadir, "goob"))
+        with pytest.raises(RuntimeError):
+            loader.SchemaLoader.from_directory(schemafile)
+
+    def test_from_directory_use_cache(self, schemafiles):
+        sdir = schemafiles.mkdir("usecache")
+        shutil.copy(schemafile, sdir)
+        cachefile = os.path.join(sdir, loader.SCHEMA_LOCATION_CACHE)
+
+        ldr = loader.SchemaLoader.from_directory(sdir)
+        assert not os.path.exists(cachefile)
+        ldr = loader.SchemaLoader.from_directory(sdir, use_cache=True)
+        assert os.path.exists(cachefile)
+        assert len(ldr) == 1
+        ejs = "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1"
+        assert ldr.locate(ejs) == \
+            os.path.join(sdir, "enhanced-json-schema.json")
+        ldr = loader.SchemaLoader.from_directory(sdir, use_cache=True)
+        assert ldr.locate(ejs) == \
+            os.path.join(sdir, "enhanced-json-schema.json")
+
+    def test_from_directory_badfiles(self, schemafiles):
+        sdir = schemafiles.mkdir("badfiles")
+        shutil.copy(schemafile, sdir)
+        with open(os.path.join(sdir, "notutf8.json"), "wb") as fd:
+            fd.write(b'{"x": "\xff\xfe"}')
+        with open(os.path.join(sdir, "notutf8schema.json"), "wb") as fd:
+            fd.write(b'{"$schema": "http://json-schema.org/draft-04/schema#",'
+                     b' "id": "urn:notutf8", "x": "\xff\xfe"}')
+        with open(os.path.join(sdir, "truncated.json"), "w") as fd:
+            fd.write('{"$schema": "http://json-schema.org/draft-04/schema#", '
+                     '"id": "urn:broken", "x": [1,2')
+        ejs = "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1"
+
+        ldr = loader.SchemaLoader.from_directory(sdir)
+        assert set(ldr.iterURIs()) == { ejs }
+        ldr = loader.SchemaLoader.from_directory(sdir, use_cache=True)
+        assert set(ldr.iterURIs()) == { ejs }
+
+        # the fast scan does not look past the ids
+        ldr = loader.SchemaLoader.from_directory(sdir, fast=True)
+        assert set(ldr.iterURIs()) == { ejs, "urn:broken" }
+
 def test_schemaLoader_for_schemas():
     ldr = loader.schemaLoader_for_schemas()
     loc = ldr.locate("https://data.nist.gov/od/dm/enhanced-json-schema/v0.1")
@@ -137,6 +294,8 @@ def test_schemaLoader_for_schemas():
     loc = ldr.locate("http://json-schema.org/draft-04/schema")
     assert os.path.basename(loc) == "json-schema.json"
     assert os.path.exists(loc)
+    assert ldr.frozen
+    assert loader.schemaLoader_for_schemas() is ldr
 
 class TestSchemaHandler(object):
 
@@ -182,6 +341,14 @@ class TestSchemaHandler(object):
 
         with pytest.raises(KeyError):
             assert hdlr["https"] is ldr 
+        assert "http" in hdlr
+        assert "https" not in hdlr
+
+        # schemes added to the loader later are seen
+        ldr.add_location("https://data.nist.gov/od/dm/enhanced-json-schema/v0.1",
+                         schemafile)
+        assert "https" in hdlr
+        assert hdlr["https"] is ldr 
 
 @pytest.fixture(scope="module")
 def schemafiles(request):
@@ -203,6 +370,13 @@ def schemafiles(request):
     request.addfinalizer(fin)
     return tf
 
+@pytest.fixture(scope="module")
+def schemacache(schemafiles):
+    # a cache over the schemafiles directory shared by the tests that only 
+    # read from it, so that its scan of the files can be reused
+    return loader.DirectorySchemaCache(os.path.join(schemafiles.parent, 
+                                                    "schemas"))
+
 class TestDirectorySchemaCache(object):
 
     def test_openfile(self, schemafiles):
@@ -227,18 +401,18 @@ class TestDirectorySchemaCache(object):
         assert id == 'http://json-schema.org/draft-04/schema#'
         assert schema['id'] == id
 
-    def test_locations(self, schemafiles):
+    def test_locations(self, schemafiles, schemacache):
         sdir = os.path.join(schemafiles.parent, "schemas")
-        cache = loader.DirectorySchemaCache(sdir)
+        cache = schemacache
         loc = cache.locations()
         assert loc['http://json-schema.org/draft-04/schema'] == \
             os.path.join(sdir, "extern", "json-schema.json")
         assert loc['http://mgi.nist.gov/json/registry-resource/v0.1'] == \
             os.path.join(sdir, "registry-resource_schema.json")
 
-    def test_locations_abs(self, schemafiles):
+    def test_locations_abs(self, schemafiles, schemacache):
         sdir = os.path.join(schemafiles.parent, "schemas")
-        cache = loader.DirectorySchemaCache(sdir)
+        cache = schemacache
         loc = cache.locations(True)
         assert loc['http://json-schema.org/draft-04/schema'] == \
             os.path.join(sdir, "extern", "json-schema.json")
@@ -246,15 +420,214 @@ class TestDirectorySchemaCache(object):
             os.path.join(sdir, "registry-resource_schema.json")
         assert len(loc) == 2
 
-    def test_schemas(self, schemafiles):
-        sdir = os.path.join(schemafiles.parent, "schemas")
+    def test_load_or_build_cache(self, schemafiles):
+        sdir = schemafiles.mkdir("cachetest")
+        shutil.copy(os.path.join(exdir,"registry-resource_schema.json"), sdir)
+        cachefile = os.path.join(sdir, loader.SCHEMA_LOCATION_CACHE)
         cache = loader.DirectorySchemaCache(sdir)
+
+        loc = cache.load_or_build_cache()
+        assert loc == cache.locations()
+        assert os.path.exists(cachefile)
+        with open(cachefile) as fd:
+            saved = json.load(fd)
+        assert saved["locations"] == cache.locations(False)
+
+        # an unchanged directory is not rescanned
+        saved["locations"]["urn:goob"] = "goob.json"
+        with open(cachefile, "w") as fd:
+            json.dump(saved, fd)
+        loc = cache.load_or_build_cache(absolute=False)
+        assert loc["urn:goob"] == "goob.json"
+
+        # ...unless the saved map was built the other way
+        loc = cache.load_or_build_cache(absolute=False, fast=True)
+        assert "urn:goob" not in loc
+        with open(cachefile) as fd:
+            assert json.load(fd)["fast"] is True
+        loc = cache.load_or_build_cache(absolute=False)
+        assert loc == cache.locations(False)
+
+        # or the saved map is unusable
+        saved["locations"] = [ "goob.json" ]
+        with open(cachefile, "w") as fd:
+            json.dump(saved, fd)
+        assert cache.load_or_build_cache() == cache.locations()
+
+        # a changed directory is
+        shutil.copy(schemafile, sdir)
+        loc = cache.load_or_build_cache()
+        assert "urn:goob" not in loc
+        assert loc == cache.locations()
+        assert len(loc) == 2
+
+    def test_build_cache_fingerprints_once(self, schemafiles, monkeypatch):
+        sdir = schemafiles.mkdir("cacheonce")
+        shutil.copy(os.path.join(exdir,"registry-resource_schema.json"), sdir)
+        cache = loader.DirectorySchemaCache(sdir)
+        calls = []
+        fingerprint = cache._fingerprint
+        def counted(*args):
+            calls.append(args)
+            return fingerprint(*args)
+        monkeypatch.setattr(cache, "_fingerprint", counted)
+
+        for fast in (False, True):
+            del calls[:]
+            assert len(cache.load_or_build_cache(fast=fast)) == 1
+            assert len(calls) == 1
+
+    def test_replaced_with_older(self, schemafiles):
+        sdir = schemafiles.mkdir("older")
+        sfile = os.path.join(sdir, "goob.json")
+        with open(sfile, "w") as fd:
+            json.dump({ "$schema": "http://json-schema.org/draft-04/schema#",
+                        "id": "urn:goob" }, fd)
+        cache = loader.DirectorySchemaCache(sdir)
+        assert list(cache.locations()) == [ "urn:goob" ]
+        assert list(cache.load_or_build_cache()) == [ "urn:goob" ]
+
+        # replace the file with one of the same size that is not newer 
+        # (as with cp -p)
+        st = os.stat(sfile)
+        with open(sfile, "w") as fd:
+            json.dump({ "$schema": "http://json-schema.org/draft-04/schema#",
+                        "id": "urn:gurn" }, fd)
+        os.utime(sfile, ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+        assert list(cache.locations()) == [ "urn:gurn" ]
+        assert list(cache.load_or_build_cache()) == [ "urn:gurn" ]
+
+    def test_workers(self, schemafiles):
+        sdir = os.path.join(schemafiles.parent, "schemas")
+        cache = loader.DirectorySchemaCache(sdir, workers=4)
+        loc = cache.locations()
+        assert loc == loader.DirectorySchemaCache(sdir).locations()
+        assert len(loc) == 2
+        assert cache.locations_fast() == loc
+        assert set(cache.schemas()) == \
+            set(loader.DirectorySchemaCache(sdir).schemas())
+
+    def test_schemas(self, schemacache):
+        cache = schemacache
         loc = cache.schemas()
         assert loc['http://json-schema.org/draft-04/schema#']['id'] == \
             "http://json-schema.org/draft-04/schema#"
         assert loc['http://mgi.nist.gov/json/registry-resource/v0.1#']['id'] == \
             "http://mgi.nist.gov/json/registry-resource/v0.1#"
 
+    def test_rescan(self, schemafiles):
+        sdir = schemafiles.mkdir("rescan")
+        shutil.copy(schemafile, sdir)
+        cache = loader.DirectorySchemaCache(sdir)
+
+        schemas = cache.schemas()
+        assert len(schemas) == 1
+        again = cache.schemas()
+        for id in schemas:
+            assert again[id] is schemas[id]
+        assert cache.locations(False) == \
+            {"https://data.nist.gov/od/dm/enhanced-json-schema/v0.1":
+                 "enhanced-json-schema.json"}
+
+        # an added file triggers a rescan
+        shutil.copy(os.path.join(exdir,"registry-resource_schema.json"), sdir)
+        again = cache.schemas()
+        assert len(again) == 2
+
+        # the parsed schemas are shared via the schema pool
+        cache.invalidate()
+        schemas = cache.schemas()
+        assert len(schemas) == 2
+        for id in schemas:
+            assert again[id] is schemas[id]
+        assert loader.DirectorySchemaCache(sdir).schemas() == schemas
+
+        cache.invalidate()
+        loader.clear_schema_pool()
+        schemas = cache.schemas()
+        for id in schemas:
+            assert again[id] is not schemas[id]
+
+    def test_cold_scan_walks_once(self, monkeypatch):
+        # the directory is only fingerprinted when reusing a scan
+        cache = loader.DirectorySchemaCache(schemadir)
+        calls = []
+        fingerprint = cache._fingerprint
+        def counted(*args):
+            calls.append(args)
+            return fingerprint(*args)
+        monkeypatch.setattr(cache, "_fingerprint", counted)
+
+        locs = cache.locations()
+        assert calls == []
+        assert cache.locations() == locs
+        assert len(calls) == 1
+        assert cache._scanned[True][0] == fingerprint()
+
+    def test_notanobject(self, schemafiles):
+        sdir = schemafiles.mkdir("notobj")
+        with open(os.path.join(sdir, "list.json"), "w") as fd:
+            json.dump(["$schema", "http://json-schema.org/draft-04/schema#"],
+                      fd)
+        cache = loader.DirectorySchemaCache(sdir)
+        with pytest.raises(loader.DirectorySchemaCache.NotASchemaError):
+            cache.open_file("list.json")
+        assert cache.locations() == {}
+
+    def test_open_file_mapped(self, monkeypatch):
+        # small threshold forces memory-mapping (if orjson is available)
+        monkeypatch.setattr(loader, "MMAP_THRESHOLD", 16)
+        loader.clear_schema_pool()
+        cache = loader.DirectorySchemaCache(datadir)
+        id, schema = cache.open_file("noid_schema.json")
+        assert "$schema" in schema
+        with pytest.raises(loader.DirectorySchemaCache.NotASchemaError):
+            cache.open_file("loc.json")
+        loader.clear_schema_pool()
+
+    def test_parse_file_numbers(self, schemafiles, monkeypatch):
+        # numbers orjson reads differently parse as they do with json
+        sdir = schemafiles.mkdir("numbers")
+        path = os.path.join(sdir, "numbers.json")
+        with open(path, "w") as fd:
+            fd.write('{ "big": 18446744073709551616, '
+                     '"neg": -9223372036854775809, "nan": NaN, '
+                     '"inf": -Infinity, "pad": "' + 64 * 'x' + '" }')
+
+        for threshold in (loader.MMAP_THRESHOLD, 16):
+            monkeypatch.setattr(loader, "MMAP_THRESHOLD", threshold)
+            data = loader._parse_file(path)
+            assert data["big"] == 2**64
+            assert isinstance(data["big"], int)
+            assert data["neg"] == -2**63 - 1
+            assert isinstance(data["neg"], int)
+            assert math.isnan(data["nan"])
+            assert data["inf"] == -math.inf
+
+    def test_open_file_pooled(self):
+        cache = loader.DirectorySchemaCache(schemadir)
+        id, schema = cache.open_file("enhanced-json-schema.json")
+        ldr = loader.SchemaLoader({id: schemafile})
+        assert ldr.load_schema(id) is schema
+        assert cache.open_file("enhanced-json-schema.json")[1] is schema
+
+    def test_iter_locations(self, schemacache):
+        cache = schemacache
+        it = cache.iter_locations(False)
+        id, path = next(it)
+        assert not os.path.isabs(path)
+        assert len(list(it)) == 1
+        assert dict(cache.iter_locations()) == cache.locations()
+        assert len(list(cache.iter_locations(recursive=False))) == 1
+
+    def test_iter_schemas(self, schemacache):
+        cache = schemacache
+        it = cache.iter_schemas()
+        id, schema = next(it)
+        assert schema['id'] == id
+        assert len(list(it)) == 1
+        assert len(list(cache.iter_schemas(False))) == 1
+
     def test_openfile_fileid(self):
         cache = loader.DirectorySchemaCache(datadir)
         (id, schema) = cache.open_file("noid_schema.json")
@@ -262,8 +635,9 @@ class TestDirectorySchemaCache(object):
 
     def test_notaschema(self):
         cache = loader.DirectorySchemaCache(datadir)
-        with pytest.raises(loader.DirectorySchemaCache.NotASchemaError):
+        with pytest.raises(loader.DirectorySchemaCache.NotASchemaError) as ex:
             cache.open_file("loc.json")
+        assert ex.value.path == "loc.json"
 
     def test_locs_nota(self):
         cache = loader.DirectorySchemaCache(datadir)
@@ -271,6 +645,39 @@ class TestDirectorySchemaCache(object):
         assert "file://" + os.path.join(datadir, "noid_schema.json") in loc
         assert len(loc) == 2
 
+    def test_locations_fast(self, schemacache):
+        cache = schemacache
+        assert cache.locations_fast() == cache.locations()
+
+        cache = loader.DirectorySchemaCache(datadir)
+        loc = cache.locations_fast()
+        assert loc == cache.locations()
+        assert "file://" + os.path.join(datadir, "noid_schema.json") in loc
+
+    def test_locations_fast_bighead(self, schemafiles):
+        sdir = schemafiles.mkdir("bighead")
+        schema = { "$schema": "http://json-schema.org/draft-04/schema#",
+                   "description": "} " * loader._HEAD_SIZE,
+                   "id": "urn:bighead" }
+        with open(os.path.join(sdir, "bighead.json"), "w") as fd:
+            json.dump(schema, fd)
+
+        loc = loader.DirectorySchemaCache(sdir).locations_fast()
+        assert loc == { "urn:bighead": os.path.join(sdir, "bighead.json") }
+
+    def test_scan_ids(self):
+        props, done = loader._scan_ids(
+            '{"a": {"id": "x", "b": [{"id": "y"}]}, "id": "u\\"rn", '+
+            '"$schema": "urn:s", "z": ')
+        assert done
+        assert props == { "id": 'u"rn', "$schema": "urn:s" }
+
+        assert loader._scan_ids('{"id": "urn:x", "a": 1}') == \
+            ({ "id": "urn:x" }, True)
+        assert loader._scan_ids('{"id": "urn:x", "a": ') == \
+            ({ "id": "urn:x" }, False)
+        assert loader._scan_ids('[{"id": "urn:x"}]') is None
+
     def test_save(self, schemafiles):
         sdir = os.path.join(schemafiles.parent, "schemas")
         slfile = os.path.join(sdir,"schemaLocation.json")
@@ -309,6 +716,26 @@ class TestDirectorySchemaCache(object):
             if os.path.exists(slfile):
                 os.remove(slfile)
         
+    def test_save_msgpack(self, schemafiles):
+        slfile = os.path.join(schemafiles.parent, "locations.msgpack")
+        cache = loader.DirectorySchemaCache(datadir)
+        with pytest.raises(RuntimeError):
+            cache.save_locations(slfile, fmt="xml")
+
+        try:
+            # (written as JSON if msgpack is not available)
+            cache.save_locations(slfile, True, fmt="msgpack")
+            with open(slfile, 'rb') as fd:
+                assert (fd.read(1) == b'{') == (not loader.msgpack)
+            ldr = loader.SchemaLoader.from_location_file(slfile)
+            assert len(ldr) == 2
+            assert ldr.locate('file://'+os.path.join(datadir,
+                                                     "noid_schema.json")) == \
+                os.path.join(datadir, "noid_schema.json")
+        finally:
+            if os.path.exists(slfile):
+                os.remove(slfile)
+
     def test_recursive(self, schemafiles):
         sdir = schemafiles("schemas")
         cache = loader.DirectorySchemaCache(sdir)
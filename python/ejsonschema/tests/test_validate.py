@@ -1,12 +1,10 @@
 
 # import pytest
 from __future__ import with_statement
-import json, os, pytest, shutil, pdb
-from io import StringIO
+import os, re, json, weakref, pytest
 
-from . import Tempfiles
+from . import load_json
 import ejsonschema.validate as val
-import ejsonschema.schemaloader as loader
 from ejsonschema.instance import DEF_EXTSCHEMAS
 
 from .config import schema_dir as schemadir, data_dir as datadir, \
@@ -18,6 +16,28 @@ ipr_ex = os.path.join(exdir, "ipr.json")
 def validator(request):
     return val.ExtValidator.with_schema_dir(exdir)
 
+@pytest.fixture(scope="module")
+def schemadir_validator(request):
+    return val.ExtValidator.with_schema_dir(schemadir)
+
+# the parsed JSON documents used by the tests; these are shared by the tests
+# in this module, so they should not be altered.
+@pytest.fixture(scope="module")
+def enh_doc():
+    return load_json(enh_json_schema)
+
+@pytest.fixture(scope="module")
+def ipr_doc():
+    return load_json(ipr_ex)
+
+@pytest.fixture(scope="module")
+def unresolvable_doc():
+    return load_json(os.path.join(datadir, "unresolvableref.json"))
+
+@pytest.fixture(scope="module")
+def invalidext_doc():
+    return load_json(os.path.join(datadir, "invalidextension.json"))
+
 def test_ipr(validator):
     # borrowed from test_examples.py, this test exercises most of the features
     # of the validator module.  If the ipr.json example breaks, this breaks.
@@ -29,7 +49,7 @@ def test_ipr(validator):
     #
     validator.validate_file(ipr_ex, False, False)
 
-def test_extschema():
+def test_extschema(schemadir_validator):
     # borrowed from test_schemas.py, this test exercises most of the features
     # of the validator module.  If the ipr.json example breaks, this breaks.
     #   * initializing a validator with resolver using SchemaHandler
@@ -37,8 +57,7 @@ def test_extschema():
     #   * extension schema validation
     #   * initiating validation on a filename
     # 
-    validator = val.ExtValidator.with_schema_dir(schemadir)
-    validator.validate_file(enh_json_schema, False, True)
+    schemadir_validator.validate_file(enh_json_schema, False, True)
 
 def test_extschema2():
     # This test is equivalent to test_extschema() except that it uses
@@ -47,68 +66,100 @@ def test_extschema2():
     validator = val.SchemaValidator()
     validator.validate_file(enh_json_schema, False, True)
 
-class TestExtValidator(object):
+# expected error messages
+_UNRESOLVABLE_RE = re.compile(r"schema document for urn:unresolvable\.json")
+_NOT_ARRAY_RE = re.compile(r"3 is not of type 'array'")
+
+def _both_fail(validator, inst, path, exc, match=None):
+    # check that strict validation of both the parsed instance and the file
+    # it came from raise the given exception
+    with pytest.raises(exc, match=match):
+        validator.validate(inst, False, True)
+    with pytest.raises(exc, match=match):
+        validator.validate_file(path, False, True)
 
-    def test_isextschemaschema(self, validator):
-        with open(enh_json_schema) as fd:
-            assert validator.is_extschema_schema(json.load(fd))
+class TestExtValidator(object):
 
-        with open(ipr_ex) as fd:
-            assert not validator.is_extschema_schema(json.load(fd))
+    def test_isextschemaschema(self, validator, enh_doc, ipr_doc):
+        assert validator.is_extschema_schema(enh_doc)
+        assert not validator.is_extschema_schema(ipr_doc)
 
-    def test_usesloader(self):
+    def test_usesloader(self, enh_doc):
         # ...by testing lack of loader
         validator = val.ExtValidator()
         with pytest.raises(val.RefResolutionError):
             validator.validate_file(enh_json_schema, False, True)
 
         # This specifically tests the use of RefResolver
-        with open(enh_json_schema) as fd:
-            enh = json.load(fd)
-
         validator = val.ExtValidator()
-        validator._schemaStore[enh['id']] = enh
+        validator._schemaStore[enh_doc['id']] = enh_doc
 
         with pytest.raises(val.RefResolutionError):
             validator.validate_file(enh_json_schema, False, True)
 
-    def test_strict(self, validator):
+    def test_strict(self, validator, unresolvable_doc):
         probfile = os.path.join(datadir, "unresolvableref.json")
 
-        # this should work
-        validator.validate_file(probfile, False, False)
-
-        # these should not
-        with open(probfile) as fd:
-            inst = json.load(fd)
+        # (see also test_validate_file_modes())
+        inst = unresolvable_doc
         errs = validator.validate_against(inst, "urn:unresolvable.json", True)
-        assert len(list(filter(lambda e: isinstance(e, val.RefResolutionError),errs))) > 0
+        assert any(isinstance(e, val.RefResolutionError) for e in errs)
 
-        with pytest.raises(val.RefResolutionError):
-            validator.validate(inst, False, True)
-
-        with pytest.raises(val.RefResolutionError):
-            validator.validate_file(probfile, False, True)
+        _both_fail(validator, inst, probfile, val.RefResolutionError,
+                   _UNRESOLVABLE_RE)
 
-
-    def test_invalidextension(self):
-        validator = val.ExtValidator.with_schema_dir(schemadir)
+    def test_invalidextension(self, schemadir_validator, invalidext_doc):
+        validator = schemadir_validator
         probfile = os.path.join(datadir, "invalidextension.json")
 
-        # this should work
-        validator.validate_file(probfile, True, True)
-
-        # these should not
-        with open(probfile) as fd:
-            inst = json.load(fd)
+        # (see also test_validate_file_modes())
+        inst = invalidext_doc
         errs = validator.validate_against(inst, inst[DEF_EXTSCHEMAS][0], True)
-        assert len(list(filter(lambda e: isinstance(e, val.ValidationError),errs))) > 0
-
-        with pytest.raises(val.ValidationError):
-            validator.validate(inst, False, True)
-
-        with pytest.raises(val.ValidationError):
-            validator.validate_file(probfile, False, True)
+        assert any(isinstance(e, val.ValidationError) for e in errs)
+
+        _both_fail(validator, inst, probfile, val.ValidationError, 
+                   _NOT_ARRAY_RE)
+
+    def test_validate_file_modes(self, validator, schemadir_validator):
+        # each case: the validator, the file, the minimally and strict 
+        # arguments, and the expected exception (or None if it's valid)
+        cases = [
+            (validator, "unresolvableref.json", True,  True,  None),
+            (validator, "unresolvableref.json", True,  False, None),
+            (validator, "unresolvableref.json", False, True,  
+                                                   val.RefResolutionError),
+            (validator, "unresolvableref.json", False, False, None),
+            (schemadir_validator, "invalidextension.json", True,  True,  None),
+            (schemadir_validator, "invalidextension.json", True,  False, None),
+            (schemadir_validator, "invalidextension.json", False, True,  
+                                                   val.ValidationError),
+            (schemadir_validator, "invalidextension.json", False, False, 
+                                                   val.ValidationError)
+        ]
+
+        for v, file, minimally, strict, exc in cases:
+            probfile = os.path.join(datadir, file)
+            if exc:
+                with pytest.raises(exc):
+                    v.validate_file(probfile, minimally, strict)
+            else:
+                v.validate_file(probfile, minimally, strict)
+
+    def test_validate_file_numbers(self, tmp_path):
+        # the file parses as it would with the json module
+        validator = val.ExtValidator()
+        validator.load_schema({
+            "id": "urn:numbers", "type": "object",
+            "properties": { "n": { "type": "integer" },
+                            "x": { "type": "number" } }
+        })
+        path = tmp_path / "doc.json"
+        path.write_text('{ "$schema": "urn:numbers", '
+                        '"n": 18446744073709551616, "x": NaN }')
+
+        validator.validate_file(str(path), False, True)
+        with open(path) as fd:
+            validator.validate(json.load(fd), False, True)
 
     def test_loadschema(self, validator):
         schema = {
@@ -129,15 +180,207 @@ class TestExtValidator(object):
 
         inst["name"] = 3
         errs = validator.validate_against(inst, [uri])
-        assert len(list(filter(lambda e: isinstance(e, val.ValidationError),errs))) > 0
+        assert any(isinstance(e, val.ValidationError) for e in errs)
 
         inst["name"] = "bob"
         validator.load_schema(schema)
         errs = validator.validate_against(inst, [schema['id']])
         assert len(errs) == 0
 
-def test_exc2json():
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+    def test_compile_for(self):
+        validator = val.ExtValidator()
+        schema = {
+            "type": "object",
+            "properties": {
+                "name": { "type": "string" }
+            },
+            "id": "urn:gurn"
+        }
+        validator.load_schema(schema)
+        assert validator.compile_for("urn:gurn") == []
+        compiled = validator._validators["urn:gurn"]
+
+        assert len(validator.validate_against({"name": 3}, ["urn:gurn"])) > 0
+        assert validator._validators["urn:gurn"] is compiled
+
+        errs = validator.compile_for("urn:goob")
+        assert len(errs) == 1
+        assert isinstance(errs[0], val.MissingSchemaDocument)
+
+    @pytest.mark.skipif(val._support.orjson is None,
+                        reason="serialization check needs orjson")
+    def test_may_have_extensions(self, enh_doc):
+        validator = val.ExtValidator()
+        assert validator._may_have_extensions(enh_doc)
+        assert validator._may_have_extensions(
+            { "a": [ { DEF_EXTSCHEMAS: [] } ] })
+        assert not validator._may_have_extensions({ "a": [ 1, "b" ] })
+        assert not validator._may_have_extensions({ "$schema": "urn:x" })
+
+        # the property value can be mistaken for a property
+        assert validator._may_have_extensions({ "a": DEF_EXTSCHEMAS })
+
+        validator = val.ExtValidator(ejsprefix='_')
+        assert not validator._may_have_extensions(enh_doc)
+        assert validator._may_have_extensions({ "_extensionSchemas": [] })
+
+    def test_may_have_extensions_noorjson(self, monkeypatch):
+        # without orjson, the instance is always walked
+        monkeypatch.setattr(val._support, "orjson", None)
+        validator = val.ExtValidator()
+        assert validator._may_have_extensions({ "a": [ 1, "b" ] })
+        assert validator._may_have_extensions({ "$schema": "urn:x" })
+
+    def test_user_attrs(self):
+        # user code may attach its own attributes and take weak references
+        validator = val.ExtValidator()
+        validator.note = "goob"
+        assert weakref.ref(validator)() is validator
+
+    def test_meta_validator(self):
+        cls = val.jsch.validator_for({})
+        meta = val.ExtValidator._meta_validator(cls)
+        assert meta.schema is cls.META_SCHEMA
+        assert val.ExtValidator._meta_validator(cls) is meta
+        assert val.ExtValidator()._meta_validator(cls) is meta
+
+    def test_reloadschema(self):
+        validator = val.ExtValidator()
+        schema = {
+            "type": "object",
+            "properties": {
+                "name": { "type": "string" }
+            },
+            "id": "urn:gurn"
+        }
+        inst = { "name": 3 }
+
+        validator.load_schema(schema)
+        assert len(validator.validate_against(inst, [schema['id']])) > 0
+        assert validator._validators[schema['id']].schema is schema
+
+        # a reloaded schema should replace any previously compiled version
+        schema = dict(schema)
+        schema["properties"] = { "name": { "type": "integer" } }
+        validator.load_schema(schema)
+        assert schema['id'] not in validator._validators
+        assert len(validator.validate_against(inst, [schema['id']])) == 0
+        assert validator._validators[schema['id']].schema is schema
+
+    def test_load_referenced_later(self):
+        # a schema may refer to one that gets loaded after it
+        validator = val.ExtValidator()
+        validator.load_schema({
+            "id": "urn:a",
+            "type": "object",
+            "properties": { "b": { "$ref": "urn:b#/definitions/x" } }
+        })
+        validator.load_schema({
+            "id": "urn:b",
+            "definitions": { "x": { "type": "string" } }
+        })
+
+        errs = validator.validate_against({ "b": 3 }, ["urn:a"])
+        assert len(errs) == 1
+        assert isinstance(errs[0], val.ValidationError)
+        assert "is not of type 'string'" in errs[0].message
+        assert validator.validate_against({ "b": "3" }, ["urn:a"]) == []
+
+    def test_raise_first(self):
+        validator = val.ExtValidator()
+        validator.load_schema({ "type": "object", "id": "urn:gurn" })
+        assert validator.compile_for("urn:gurn") == []
+        first = val.ValidationError("first")
+
+        def iter_errors(instance):
+            yield first
+            raise AssertionError("looked past the first error")
+        validator._validators["urn:gurn"].iter_errors = iter_errors
+
+        inst = { "$schema": "urn:gurn" }
+        with pytest.raises(val.ValidationError) as excinfo:
+            validator.validate(inst)
+        assert excinfo.value is first
+
+    def test_badextitem(self):
+        validator = val.ExtValidator()
+        validator.load_schema({ "type": "object", "id": "urn:gurn" })
+        for item in [ None, 3, { "a": "b" } ]:
+            inst = { "$schema": "urn:gurn",
+                     "a": { DEF_EXTSCHEMAS: [ "urn:gurn", item ] } }
+            errs = validator.validate(inst, raiseex=False)
+            assert isinstance(errs, list)
+            assert len(errs) == 1
+            assert "array item type" in errs[0].message
+            assert errs[0].instance is inst["a"][DEF_EXTSCHEMAS]
+
+            with pytest.raises(val.ValidationError):
+                validator.validate(inst)
+
+    def test_spliturifrag(self):
+        validator = val.ExtValidator()
+        for uri, split in [
+                ("urn:goob", ("urn:goob", "")),
+                ("urn:goob#", ("urn:goob", "")),
+                ("urn:goob#/definitions/Name", 
+                 ("urn:goob", "/definitions/Name")),
+                ("https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/a",
+                 ("https://data.nist.gov/od/dm/enhanced-json-schema/v0.1",
+                  "/a")),
+                ("#/definitions/Name", ("", "/definitions/Name")) ]:
+            assert validator._spliturifrag(uri) == split
+
+    def test_validate_against_args(self):
+        validator = val.ExtValidator()
+        validator.load_schema({ "type": "object", "id": "urn:gurn" })
+        assert validator.validate_against(3, []) == []
+        assert validator.validate_against(3) == []
+        assert len(validator.validate_against(3, "urn:gurn")) == 1
+        assert len(validator.validate_against(3, ("urn:gurn",))) == 1
+
+    def test_store_sync(self):
+        validator = val.ExtValidator()
+        schema = { "type": "object", "id": "urn:gurn" }
+        validator.load_schema(schema)
+        assert validator.validate_against({}, [schema['id']]) == []
+
+        # a schema picked up by the resolver gets shared
+        store = validator._validators[schema['id']].resolver.store
+        store["urn:fetched"] = { "type": "string" }
+        assert validator.validate_against({}, [schema['id']]) == []
+        assert "urn:fetched" in validator._schemaStore
+
+    def test_reloadschema_unchanged(self, monkeypatch):
+        validator = val.ExtValidator()
+        schema = {
+            "type": "object",
+            "properties": {
+                "name": { "type": "string" }
+            },
+            "id": "urn:gurn"
+        }
+        validator.load_schema(schema)
+
+        def nocheck(vcls):
+            raise AssertionError("schema needlessly rechecked")
+        monkeypatch.setattr(val.ExtValidator, "_meta_validator", 
+                            staticmethod(nocheck))
+
+        # same content: no recheck, but the new copy is used
+        schema = dict(reversed(list(schema.items())))
+        validator.load_schema(schema)
+        assert len(validator.validate_against({ "name": 3 }, 
+                                              [schema['id']])) > 0
+        assert validator._validators[schema['id']].schema is schema
+
+        # changed content gets checked
+        schema = dict(schema)
+        schema["type"] = 3
+        with pytest.raises(AssertionError):
+            validator.load_schema(schema)
+
+def test_exc2json(schemadir_validator):
+    validator = schemadir_validator
     probfile = os.path.join(datadir, "invalidextension.json")
 
     errs = validator.validate_file(probfile, False, True, False)
@@ -145,11 +388,9 @@ def test_exc2json():
 
     data = [val.exc_to_json(err) for err in errs]
     assert len(data) == 2
-    assert len(list(filter(lambda e: e['message'], data))) == 2
-    assert len(list(filter(lambda e: e['type'], data))) == 2
-    assert len(list(filter(lambda e: e['type'] == 'validation', data))) == 2
-    assert len(list(filter(lambda e: e['path'], data))) == 2
-    assert len(list(filter(lambda e: e['validator'], data))) == 2
+    for e in data:
+        assert e['type'] == 'validation'
+        assert e['message'] and e['path'] and e['validator']
 
 
         
@@ -3,15 +3,11 @@ This suite tests the validation of schemas that use the enhanced documentation.
 """
 # import pytest
 from __future__ import with_statement
-import json, os, pytest, shutil
-import jsonschema as jsch
-from io import StringIO
+import os, pytest
 
-from . import Tempfiles
 import ejsonschema.validate as val
-import ejsonschema.schemaloader as loader
 
-from .config import schema_dir as schemadir, data_dir as datadir
+from .config import schema_dir as schemadir
 enh_json_schema = os.path.join(schemadir, "enhanced-json-schema.json")
 
 @pytest.fixture(scope="module")
@@ -25,9 +21,7 @@ schemashell = {
 }
 
 def test_NotesType(validator):
-    schema = schemashell.copy()
-    schema['id'] = "urn:notes"
-    schema["type"] = "object"
+    schema = { **schemashell, "id": "urn:notes", "type": "object" }
     schema["properties"] = {
         "sayings": {
             "$ref": "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/Notes"
@@ -42,12 +36,12 @@ def test_NotesType(validator):
 
     inst['sayings'] = "Hello"
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     
 def test_DocumentationType(validator):
-    schema = schemashell.copy()
-    schema['$ref'] = "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/Documentation"
-    schema['id'] = "urn:doc"
+    schema = { **schemashell,
+               "$ref": "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/Documentation",
+               "id": "urn:doc" }
     validator.load_schema(schema)
 
     inst = {
@@ -61,19 +55,19 @@ def test_DocumentationType(validator):
 
     inst["notes"] = "1, 2"
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["notes"] = [ "1", "2" ]
     validator.validate_against(inst, [schema['id']])
 
     inst["comments"] = [ 1, 2 ]
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["comments"] = [ "yes", "no" ]
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
     inst["description"] = [ "the def" ]
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["description"] = "the def"
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
@@ -83,10 +77,10 @@ def test_oldschemauri(validator):
     ejsonschema schema.  As long as the deprecated URI has an entry in the 
     [schema_dir]/schemaLocation.json file, it should work.  
     """
-    schema = schemashell.copy()
-    schema["$extensionSchemas"] = [ "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1#" ]
-    schema['$ref'] = "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/Documentation"
-    schema['id'] = "urn:doc"
+    schema = { **schemashell,
+               "$extensionSchemas": [ "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1#" ],
+               "$ref": "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/Documentation",
+               "id": "urn:doc" }
 
     validator.validate(schema, strict=True)
     
@@ -95,9 +89,9 @@ def test_oldschemauri(validator):
         validator.validate(schema, strict=True)
     
 def test_PropDocumentationType(validator):
-    schema = schemashell.copy()
-    schema['$ref'] = "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/PropertyDocumentation"
-    schema['id'] = "urn:propdoc"
+    schema = { **schemashell,
+               "$ref": "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1#/definitions/PropertyDocumentation",
+               "id": "urn:propdoc" }
     validator.load_schema(schema)
 
     inst = {
@@ -121,42 +115,39 @@ def test_PropDocumentationType(validator):
 
     inst["notes"] = "1, 2"
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["notes"] = [ "1", "2" ]
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
     inst["comments"] = [ 1, 2 ]
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["comments"] = [ "yes", "no" ]
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
     inst["description"] = [ "the def" ]
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["description"] = "the def"
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
     inst["valueDocumentation"]["Manager"]["comments"] = [ 1, 2 ]
     errors = validator.validate_against(inst, [schema['id']])
-    assert all( [isinstance(e, val.ValidationError) for e in errors] )
+    assert all(isinstance(e, val.ValidationError) for e in errors)
     inst["valueDocumentation"]["Manager"]["comments"] = [ "1", "2" ]
     assert len(validator.validate_against(inst, [schema['id']])) == 0
 
     
-def test_topdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_topdoc(validator):
+    schema = { **schemashell, "notes": [ "yes", "no" ] }
 
-    schema['notes'] = [ "yes", "no" ]
     validator.validate(schema, strict=True)
     schema['notes'] = "yes, no" 
     with pytest.raises(val.ValidationError):
         validator.validate(schema, strict=True)
     
-def test_definitiondoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_definitiondoc(validator):
+    schema = { **schemashell }
 
     schema['definitions'] = {
         "Name": {
@@ -181,11 +172,9 @@ def test_definitiondoc():
     with pytest.raises(val.ValidationError):
         validator.validate(schema, strict=True)
     
-def test_propdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_propdoc(validator):
+    schema = { **schemashell, "type": "object" }
 
-    schema['type'] = "object"
     schema['properties'] = {
         "name": {
             "type": "string",
@@ -214,11 +203,9 @@ def test_propdoc():
     with pytest.raises(val.ValidationError):
         validator.validate(schema, strict=True)
     
-def test_addpropdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_addpropdoc(validator):
+    schema = { **schemashell, "type": "object" }
 
-    schema['type'] = "object"
     schema['additionalProperties'] = {
         "type": "string",
         "notes": [ "not too long, please" ]
@@ -244,11 +231,9 @@ def test_addpropdoc():
         validator.validate(schema, strict=True)
     
     
-def test_patpropdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_patpropdoc(validator):
+    schema = { **schemashell, "type": "object" }
 
-    schema['type'] = "object"
     schema['patternProperties'] = {
         "proto_.*": {
             "type": "string",
@@ -278,11 +263,9 @@ def test_patpropdoc():
         validator.validate(schema, strict=True)
     
     
-def test_depdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_depdoc(validator):
+    schema = { **schemashell, "type": "object" }
 
-    schema['type'] = "object"
     schema['properties'] = {
         "name": {
             "type": "string",
@@ -333,9 +316,8 @@ def test_depdoc():
         validator.validate(schema, strict=True)
     
     
-def test_allofdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_allofdoc(validator):
+    schema = { **schemashell }
 
     schema["allOf"] = [
         {
@@ -378,9 +360,8 @@ def test_allofdoc():
     schema["definitions"]["Organization"]["allOf"][0]["notes"] = [ "hey" ]
     validator.validate(schema, strict=True)
     
-def test_anyofdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_anyofdoc(validator):
+    schema = { **schemashell }
 
     schema["anyOf"] = [
         {
@@ -425,9 +406,8 @@ def test_anyofdoc():
     schema["definitions"]["Organization"]["anyOf"][0]["notes"] = [ "hey" ]
     validator.validate(schema, strict=True)
     
-def test_oneofdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_oneofdoc(validator):
+    schema = { **schemashell }
 
     schema["oneOf"] = [
         {
@@ -472,9 +452,8 @@ def test_oneofdoc():
     schema["definitions"]["Organization"]["oneOf"][0]["notes"] = [ "hey" ]
     validator.validate(schema, strict=True)
     
-def test_notdoc():
-    schema = schemashell.copy();
-    validator = val.ExtValidator.with_schema_dir(schemadir)
+def test_notdoc(validator):
+    schema = { **schemashell }
 
     schema["not"] = {
         "type": "integer",
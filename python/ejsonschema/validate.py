@@ -3,32 +3,50 @@ a module that provides support for validating schemas that support
 extended json-schema tags.
 """
 from __future__ import with_statement
-import sys, os, json
+import sys, os, json, hashlib
+from functools import lru_cache
 try:
     from collections.abc import Mapping
 except ImportError:
     from collections import Mapping
 try:
     # python 3
-    import urllib.parse as urlparse
     from builtins import str as unicode
 except ImportError:
-    import urlparse
+    pass
 
 import jsonschema
 import jsonschema.validators as jsch
 from jsonschema.exceptions import (ValidationError, SchemaError, 
                                    RefResolutionError)
 
-from . import schemaloader as loader
+from . import schemaloader as loader, _support
+from .schemaloader import _parse_file
 from .instance import Instance, EXTSCHEMAS
 
 SCHEMATAG = "schema"
 
 # These are URIs that identify versions of the JSON Enhanced Schema schem
-EXTSCHEMA_URIS = [ "http://mgi.nist.gov/mgi-json-schema/v0.1",
-                   "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1",
-                   "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1" ]
+EXTSCHEMA_URIS = frozenset((
+    "http://mgi.nist.gov/mgi-json-schema/v0.1",
+    "https://www.nist.gov/od/dm/enhanced-json-schema/v0.1",
+    "https://data.nist.gov/od/dm/enhanced-json-schema/v0.1" ))
+
+# a search result meaning "nothing found" (where None may be a real value)
+_NOTFOUND = object()
+
+def _digest(schema):
+    # a fingerprint of a schema's content, independent of key order
+    return hashlib.blake2b(json.dumps(schema, sort_keys=True).encode('utf-8'),
+                           digest_size=16).digest()
+
+@lru_cache(maxsize=1024)
+def _spliturifrag(uri):
+    # the same handful of schema URIs get split over and over.  Schema ids 
+    # are used as given, so a plain split on the first '#' is all that is
+    # needed (rather than a full parse with urldefrag).
+    (base, sep, frag) = uri.partition('#')
+    return (base, frag)
 
 class ExtValidator(object):
     """
@@ -50,6 +68,11 @@ class ExtValidator(object):
     validator to look for properties '_schema' and '_extendedSchemas'
     """
 
+    # validators for the JSON Schema meta-schemas, keyed by validator class;
+    # these are shared by all instances.  (Sharing their resolvers is safe as
+    # the only resolution scope they ever push is the meta-schema's own id.)
+    _meta_validators = {}
+
     def __init__(self, schemaLoader=None, ejsprefix='$'):
         """
         initialize the validator for a set of expected schemas
@@ -66,7 +89,13 @@ class ExtValidator(object):
         self._handler = loader.SchemaHandler(schemaLoader)
         self._schemaStore = {}
         self._validators = {}
+        self._schemaErrors = {}
+        self._schemaDigests = {}
+        self._storeSizes = {}
         self._epfx = ejsprefix
+        self._schematag = ejsprefix + SCHEMATAG
+        self._extschemastag = ejsprefix + EXTSCHEMAS
+        self._extschemasmark = _support._dumps(self._extschemastag)
 
     @classmethod
     def with_schema_dir(cls, dirpath, ejsprefix='$'):
@@ -104,13 +133,23 @@ class ExtValidator(object):
         if not uri:
             raise ValueError("No id property found; set uri param instead.")
 
-        # check the schema
+        # check the schema, unless this content was already checked (as 
+        # when the same schema is reloaded)
         vcls = jsch.validator_for(schema)
-        vcls.check_schema(schema)
+        digest = _digest(schema)
+        if self._schemaDigests.get(uri) != digest:
+            for err in self._meta_validator(vcls).iter_errors(schema):
+                raise SchemaError.create_from(err)
+            self._schemaDigests[uri] = digest
 
-        # now add it
+        # now add it, dropping any validators compiled from a previous version
         self._schemaStore[uri] = schema
-        
+        for cached in (self._validators, self._schemaErrors):
+            for vuri in [u for u in cached if self._spliturifrag(u)[0] == uri]:
+                del cached[vuri]
+
+        # the validator is built on first use:  its resolver takes a copy of 
+        # the store, so building it now would hide schemas loaded later
         
     def validate(self, instance, minimally=False, strict=False, schemauri=None,
                  raiseex=True):
@@ -118,36 +157,37 @@ class ExtValidator(object):
         validate the instance document against its schema and its extensions
         as directed.  
         """
-        schematag = self._epfx + SCHEMATAG
-        extschemas = self._epfx + EXTSCHEMAS
+        schematag = self._schematag
+        extschemas = self._extschemastag
         baseSchema = schemauri
         if not baseSchema:
             baseSchema = instance.get(schematag)
         if not baseSchema:
-            raise ValidationError("Base schema ("+schematag+") not specified; " +
+            raise ValidationError(f"Base schema ({schematag}) not specified; "
                                   "unable to validate")
 
-        out = self.validate_against(instance, baseSchema, True)
-        if raiseex and len(out) > 0:
-            raise out[0]
+        out = self._check_against(instance, baseSchema, True, raiseex)
 
-        if not minimally:
+        if not minimally and self._may_have_extensions(instance):
             # we need to validate any portions including the EXTSCHEMAS property
             inst = Instance(instance, extschemastag=extschemas)
-            extensions = dict(inst.find_extended_objs())
+            extensions = inst.find_extended_objs()
 
             # If instance is actually an extension schema schema, we need to
             # ignore the definition of the EXTSCHEMAS property.
             is_extschema = self.is_extschema_schema(instance)
             
-            for ptr in extensions:
+            for ptr, ext_obj in extensions:
+                ext_val = ext_obj[extschemas]
+
                 # make sure that the EXTSCHEMAS property is invoked properly
-                if not isinstance(extensions[ptr][extschemas], list):
+                if not isinstance(ext_val, list):
                     if not is_extschema or \
-                       not isinstance(extensions[ptr][extschemas], dict):
-                        msg = "invalid value type for {0} (not an array):\n     {1}"\
-                              .format(extschemas, extensions[ptr][extschemas])
-                        ex = ValidationError(msg, instance=extensions[ptr])
+                       not isinstance(ext_val, dict):
+                        msg = f"invalid value type for {extschemas} " \
+                              "(not an array):\n     " \
+                              f"{ext_val}"
+                        ex = ValidationError(msg, instance=ext_obj)
                         if raiseex:
                             raise ex
                         out.append(ex)
@@ -157,27 +197,26 @@ class ExtValidator(object):
                         # node
                         continue
                 
-                for val in extensions[ptr][extschemas]:
-                    if not isinstance(val, (str, unicode)):
-                        ex = ValidationError(
-                                "invalid {0} array item type:\n    {1}"
-                                .format(extschemas, val),
-                                instance=extensions[ptr][extschemas])
-                        if raiseex:
-                            raise ex
-                        out.append(ex)
-                        return ex
+                # all of the listed schemas must be given as URI strings
+                bad = next((v for v in ext_val 
+                            if not isinstance(v, (str, unicode))), _NOTFOUND)
+                if bad is not _NOTFOUND:
+                    ex = ValidationError(
+                            f"invalid {extschemas} array item type:\n    "
+                            f"{bad}",
+                            instance=ext_val)
+                    if raiseex:
+                        raise ex
+                    out.append(ex)
+                    return out
                     
                 # now validate marked portion
-                out.extend( self.validate_against(extensions[ptr], 
-                                                  extensions[ptr][extschemas],
-                                                  strict) )
-                if raiseex and len(out) > 0:
-                    raise out[0]
+                out.extend( self._check_against(ext_obj, ext_val, strict, 
+                                                raiseex) )
             
         return out
 
-    def validate_against(self, instance, schemauris=[], strict=False):
+    def validate_against(self, instance, schemauris=(), strict=False):
         """
         validate the instance against each of the schemas identified by the 
         list of schemauris.  For the instance to be considered valid, it 
@@ -192,59 +231,140 @@ class ExtValidator(object):
                       otherwise, an empty list if the instance is valid against
                       all schemas.
         """
-        if isinstance(schemauris, (str, unicode)):
-            schemauris = [ schemauris ]
-        schema = None
-        out = []
+        if not schemauris:
+            return []
+        return list(self._iter_errors_against(instance, schemauris, strict))
+
+    def _check_against(self, instance, schemauris, strict, raiseex):
+        # validate_against(), except that if raiseex is True, the first 
+        # error is raised as soon as it is found (without looking for more)
+        if not raiseex:
+            return self.validate_against(instance, schemauris, strict)
+        err = next(self._iter_errors_against(instance, schemauris, strict), 
+                   None)
+        if err is not None:
+            raise err
+        return []
+
+    def _iter_errors_against(self, instance, schemauris, strict):
+        # generate the errors from validating the instance against each of 
+        # the schemas in turn, including any that prevent use of a schema
+        if isinstance(schemauris, str):
+            schemauris = (schemauris,)
+        getv = self._validators.get
         for uri in schemauris:
-            val = self._validators.get(uri)
+            # the cached validator, if there is one, without a method call
+            val = getv(uri)
             if not val:
-                (urib,frag) = self._spliturifrag(uri)
-                schema = self._schemaStore.get(urib)
-                if not schema:
-                    try:
-                        schema = self._loader(urib)
-                    except KeyError as e:
-                        ex = MissingSchemaDocument(
-                                "Unable to find schema document for " + urib)
-                        if strict:
-                            out.append(ex)
-                        continue
-                    
-                resolver = jsch.RefResolver(uri, schema, self._schemaStore,
-                                            handlers=self._handler)
-
-                if frag:
-                    try:
-                        schema = resolver.resolve_fragment(schema, frag)
-                    except RefResolutionError as ex:
-                        exc = RefResolutionError(
-                         "Unable to resolve fragment, {0} from schema, {1} ({2})"
-                         .format(frag, urib, str(ex)))
-                        out.append(exc)
-                        continue
-
-                cls = jsch.validator_for(schema)
-
-                # check the schema for errors
-                scherrs = [ SchemaError.create_from(err) \
-                            for err in cls(cls.META_SCHEMA).iter_errors(schema) ]
-                if len(scherrs) > 0:
-                    out.extend(scherrs)
+                scherrs = []
+                val = self._get_validator(uri, strict, scherrs)
+                yield from scherrs
+                if not val:
                     continue
-                
-                val = cls(schema, resolver=resolver)
 
+            yield from val.iter_errors(instance)
 
-            out.extend( [err for err in val.iter_errors(instance)] )
-
-            self._validators[uri] = val
-            self._schemaStore.update(val.resolver.store)
+            # keep any schemas the resolver had to fetch; its store only 
+            # ever grows, so there is nothing new if its size is unchanged
+            store = val.resolver.store
+            if self._storeSizes.get(uri) != (val, len(store)):
+                self._schemaStore.update(store)
+                self._storeSizes[uri] = (val, len(store))
 
+    def compile_for(self, uri):
+        """
+        prepare the validator for the schema with the given URI (checking 
+        the schema for errors) and retain it, so that later validations 
+        against the schema can use it directly.  
+
+        :argument str uri:  the URI of the schema to prepare
+        :return list: a list of errors, in the form of exceptions, that 
+                      prevent validating against the schema; an empty list
+                      if the schema is ready for use.
+        """
+        out = []
+        self._get_validator(uri, True, out)
         return out
 
+    def _get_validator(self, uri, strict, out):
+        # return the (cached) validator for the schema with the given URI or
+        # None if one cannot be created, in which case any errors are added 
+        # to out.
+        val = self._validators.get(uri)
+        if val:
+            return val
+
+        if uri in self._schemaErrors:
+            # this schema was already found to be broken
+            out.extend(self._schemaErrors[uri])
+            return None
+
+        (urib,frag) = self._spliturifrag(uri)
+        schema = self._schemaStore.get(urib)
+        if not schema:
+            try:
+                schema = self._loader(urib)
+            except KeyError as e:
+                ex = MissingSchemaDocument(
+                        f"Unable to find schema document for {urib}")
+                if strict:
+                    out.append(ex)
+                return None
+
+        resolver = jsch.RefResolver(uri, schema, self._schemaStore,
+                                    handlers=self._handler)
+
+        if frag:
+            try:
+                schema = resolver.resolve_fragment(schema, frag)
+            except RefResolutionError as ex:
+                exc = RefResolutionError(
+                 f"Unable to resolve fragment, {frag} from schema, {urib} ({ex})")
+                out.append(exc)
+                return None
+
+        cls = jsch.validator_for(schema)
+
+        # check the schema for errors, unless load_schema() already did
+        scherrs = []
+        if frag or urib not in self._schemaDigests:
+            scherrs = [ SchemaError.create_from(err) for err in 
+                        self._meta_validator(cls).iter_errors(schema) ]
+        if len(scherrs) > 0:
+            self._schemaErrors[uri] = scherrs
+            out.extend(scherrs)
+            return None
+
+        val = cls(schema, resolver=resolver)
+        self._validators[uri] = val
+        return val
+
+    @classmethod
+    def _meta_validator(cls, vcls):
+        # return the validator for the meta-schema of the given validator 
+        # class, creating it on first use
+        val = cls._meta_validators.get(vcls)
+        if val is None:
+            val = cls._meta_validators.setdefault(vcls, 
+                                                  vcls(vcls.META_SCHEMA))
+        return val
+
+    def _may_have_extensions(self, instance):
+        # return False if no object in the instance can have the extended
+        # schemas property.  With orjson, serializing is much faster than 
+        # walking the instance, and if the serialized tag is not in the 
+        # output, the property is not either.  Without it, serializing 
+        # costs more than the walk, so just do the walk.
+        if _support.orjson is None:
+            return True
+        try:
+            return self._extschemasmark in _support._dumps(instance)
+        except (TypeError, ValueError):
+            # can't tell this way
+            return True
+
     def _spliturifrag(self, uri):
-        return urlparse.urldefrag(uri)
+        return _spliturifrag(uri)
 
     def validate_file(self, filepath, minimally=False, strict=False,
                       raiseex=True):
@@ -253,8 +373,8 @@ class ExtValidator(object):
         equivalent to loading the JSON in the file and passing it to 
         validate().
         """
-        with open(filepath) as fd:
-            instance = json.load(fd)
+        # parse the raw bytes (with orjson, when available)
+        instance = _parse_file(filepath)
         return self.validate(instance, minimally, strict, raiseex=raiseex)
 
     def is_extschema_schema(self, instance):
@@ -266,7 +386,7 @@ class ExtValidator(object):
         """
         return isinstance(instance, Mapping) and \
                instance.get('id') in EXTSCHEMA_URIS and \
-               self._epfx+EXTSCHEMAS in instance
+               self._extschemastag in instance
 
 def SchemaValidator():
     """
@@ -293,39 +413,27 @@ def exc_to_json(ex):
     format the data captured in an exceptions into a JSON data record.
     """
     out = {}
-    try:
-        raise ex
-    except (ValidationError, SchemaError, RefResolutionError) as e:
+    if isinstance(ex, (ValidationError, SchemaError, RefResolutionError)):
         out.update({
-            'message':     e.message,
-            'validator':   e.validator,
-            'path':        e.path and format_path(e.path),
-            'schema':      e.schema,
-            'schema_path': e.relative_schema_path and \
-                           format_path(list(e.relative_schema_path)[:-1])
+            'message':     ex.message,
+            'validator':   ex.validator,
+            'path':        ex.path and format_path(ex.path),
+            'schema':      ex.schema,
+            'schema_path': ex.relative_schema_path and \
+                           format_path(list(ex.relative_schema_path)[:-1])
         })
 
-        try:
-            raise e
-        except ValidationError as exc:
+        if isinstance(ex, ValidationError):
             out['type'] = 'validation'
-        except SchemaError as exc:
+        elif isinstance(ex, SchemaError):
             out['type'] = 'schema'
-        except RefResolutionError as exc:
+        else:
             out['type'] = 'resolve'
-    except ValueError as e:
-        out.update({
-            'type':        'json',
-            'message':     str(e),
-            'validator':   None,
-            'path':        None,
-            'schema':      None,
-            'schema_path': None
-        })
-    except Exception as e:
+    else:
         out.update({
-            'type':        'unexpected',
-            'message':     str(e),
+            'type':        'json' if isinstance(ex, ValueError) \
+                                  else 'unexpected',
+            'message':     str(ex),
             'validator':   None,
             'path':        None,
             'schema':      None,
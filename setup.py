@@ -12,14 +12,16 @@ class build_py(_build_py):
                      'ejsonschema'
 
     def build_schemas(self):
+        # the schema files are hard-linked into the build tree where possible
+        # (copy_file falls back to copying where linking fails)
         dest = os.path.join(self._name, "resources", "schemas")
         self.mkpath(os.path.join(self.build_lib, dest))
         for f in glob.glob(os.path.join(self._schema_dir, "*-schema.json")):
             self.copy_file(f, os.path.join(self.build_lib, dest,
-                                           os.path.basename(f)))
+                                           os.path.basename(f)), link='hard')
         for f in glob.glob(os.path.join(self._schema_dir, "schemaLocation.*")):
             self.copy_file(f, os.path.join(self.build_lib, dest,
-                                           os.path.basename(f)))
+                                           os.path.basename(f)), link='hard')
         
 
     def run(self):
@@ -36,6 +38,7 @@ setup(name='ejsonschema',
       packages=['ejsonschema', 'ejsonschema.cli'],
       package_dir={'': 'python'},
       scripts=[ 'scripts/validate' ],
+      python_requires='>=3.8',
       cmdclass={'build_py': build_py}
      )
 